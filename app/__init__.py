@@ -1,8 +1,12 @@
 from flask import Flask
 from config import config
+from app.utils.helpers import setup_logging
+from app.utils.tracing import init_tracing
 import os
 
 def create_app(config_name='development'):
+    setup_logging()
+    
     app = Flask(__name__, 
                 static_folder='../static',
                 template_folder='../templates')
@@ -12,6 +16,9 @@ def create_app(config_name='development'):
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
+    # Per-request stage timings and request ids
+    init_tracing(app)
+    
     # Register blueprints
     from app.routes.main import main_bp
     from app.routes.api import api_bp
@@ -1,18 +1,36 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, send_file
 from app.services.story_generator import StoryGenerator
 from app.services.emotion_analyzer import EmotionAnalyzer
 from app.services.audio_processor import AudioProcessor
+from app.services.story_store import StoryStore, normalize_request
+from app.services.segment import Segment
+from app.services.blob_store import BlobStore
+from app.services.audio_formats import AudioFormatter, AUDIO_VARIANTS, ORIGINAL_VARIANT, negotiate_variant, variant_mimetype
+from app.services.shared_state import SharedState
+from app.services.quality_policy import QualityPolicy
+from app.utils.profiling import profile_request, load_profile
+from app.utils.helpers import cleanup_old_audio_files
+from app.utils.tracing import span, current_trace
 import os
+import time
+import threading
 import uuid
 import logging
 
 api_bp = Blueprint('api', __name__)
 
+# Caches and counters shared by every worker process
+try:
+    shared_state = SharedState()
+except Exception as e:
+    logging.error(f"❌ Error initializing shared state: {e}")
+    shared_state = None
+
 # Initialize services with error handling
 try:
     story_gen = StoryGenerator()
     emotion_analyzer = EmotionAnalyzer()
-    audio_processor = AudioProcessor()
+    audio_processor = AudioProcessor(shared_state=shared_state)
     logging.info("✅ All AI services initialized successfully")
 except Exception as e:
     logging.error(f"❌ Error initializing AI services: {e}")
@@ -20,7 +38,114 @@ except Exception as e:
     emotion_analyzer = None
     audio_processor = None
 
+# The story store needs no API keys, so stored stories stay readable even when
+# the AI services failed to initialize
+try:
+    story_store = StoryStore()
+except Exception as e:
+    logging.error(f"❌ Error initializing story store: {e}")
+    story_store = None
+
+# Optional packed audio storage instead of one file per story
+blob_store = None
+if os.environ.get('AUDIO_STORAGE') == 'packed':
+    try:
+        blob_store = BlobStore()
+    except Exception as e:
+        logging.error(f"❌ Error initializing packed audio store, using files: {e}")
+
+# Encode variants at the sample rate the narration is assembled at
+audio_formatter = AudioFormatter(audio_processor.assembler if audio_processor else None)
+
+# Steps story quality down under load so requests keep finishing in time
+quality_policy = QualityPolicy()
+
+# Segment clips and encoded variants are caches; anything untouched this long is swept
+AUDIO_CACHE_MAX_AGE_HOURS = float(os.environ.get('AUDIO_CACHE_MAX_AGE_HOURS', 24))
+AUDIO_CACHE_SWEEP_SECONDS = 3600
+_next_audio_sweep = 0.0
+_audio_sweep_lock = threading.Lock()
+
+def reinitialize_services():
+    """Rebuild per-process clients in a freshly forked worker.
+
+    The stores reopen their own connections and threads per process; only
+    the Gemini client holds state that must not cross a fork.
+    """
+    if story_gen:
+        story_gen.reset_client()
+    logging.info(f"🔁 Services reinitialized in worker {os.getpid()}")
+
+def _stage_timings():
+    """Milliseconds spent in each stage of the current request"""
+    trace = current_trace()
+    return trace.summary() if trace else {}
+
+def _wants_timings(data=None):
+    """Clients opt in to a timings field with ?timings=1 or "timings": true"""
+    return bool(request.args.get('timings') or (data or {}).get('timings'))
+
+def _count(name, amount=1):
+    """Bump a shared counter without ever failing the request"""
+    if not shared_state:
+        return
+    try:
+        shared_state.incr(name, amount)
+    except Exception as e:
+        logging.warning(f"Could not update counter {name}: {e}")
+
+def _publish_audio(story_id, audio_path):
+    """Hand finished narration to the configured storage, returning its URL and file path"""
+    if blob_store:
+        with span('write'):
+            blob_store.put_file(story_id, audio_path)
+        return f'/api/audio/{story_id}', None
+    return f'/static/audio/generated/{os.path.basename(audio_path)}', audio_path
+
+def _sweep_audio_caches():
+    """Delete old clips and variants in the background, at most once an hour per process"""
+    global _next_audio_sweep
+    if not AUDIO_CACHE_MAX_AGE_HOURS:
+        return
+    now = time.monotonic()
+    with _audio_sweep_lock:
+        if now < _next_audio_sweep:
+            return
+        _next_audio_sweep = now + AUDIO_CACHE_SWEEP_SECONDS
+    
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    def sweep():
+        for name in ('segments', 'variants'):
+            cleanup_old_audio_files(os.path.join(upload_folder, name), AUDIO_CACHE_MAX_AGE_HOURS)
+    threading.Thread(target=sweep, name='audio-cache-sweep', daemon=True).start()
+
+def _audio_formats(record):
+    """Every delivery variant of a story's narration, smallest first"""
+    if not record.get('audio_url'):
+        return []
+    return [{
+        'format': variant,
+        'mimetype': variant_mimetype(variant),
+        'url': f"/api/stories/{record['id']}/audio?format={variant}"
+    } for variant in AUDIO_VARIANTS]
+
+def _story_response(record, message=None):
+    """Build the client-facing payload for a stored story record"""
+    return {
+        'success': True,
+        'story_id': record['id'],
+        'story': record['story'],
+        'audio_url': record.get('audio_url'),
+        'audio_formats': _audio_formats(record),
+        'duration_estimate': f"{record['duration']} minutes",
+        'emotions_used': list(set([seg['emotion'] for seg in record['segments']])),
+        'segments_count': len(record['segments']),
+        'word_count': len(record['story'].split()),
+        'message': message or ('Story and audio generated successfully!' if record.get('audio_url') else 'Story generated successfully! Audio generation failed.')
+    }
+
 @api_bp.route('/generate-story', methods=['POST'])
+@profile_request
 def generate_story():
     """Generate an emotional story with TTS"""
     if not all([story_gen, emotion_analyzer, audio_processor]):
@@ -42,65 +167,469 @@ def generate_story():
         theme = data.get('theme', 'adventure')
         duration = int(data.get('duration', 3))
         moods = data.get('moods', ['neutral'])
+        request_key = normalize_request(keywords, theme, duration, moods)
         
-        logging.info(f"🎬 Generating story: {keywords}, {theme}, {duration}min, {moods}")
-        
-        # Generate story
-        story_text = story_gen.create_story(
-            keywords=keywords,
-            theme=theme,
-            target_duration=duration,
-            preferred_moods=moods
-        )
+        # Replay a stored story for an identical request when the client asks for it
+        if data.get('reuse') and story_store:
+            stored = story_store.find_by_request(request_key)
+            if stored:
+                logging.info("♻️ Replaying stored story %s", stored['id'])
+                _count('stories_replayed')
+                return jsonify(_story_response(stored, message='Story loaded from history.'))
         
-        if not story_text or "Error" in story_text:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to generate story. Please try again.'
-            }), 500
+        with quality_policy.admit(minutes=duration) as tier:
+            logging.info("🎬 Generating story: %s, %s, %smin, %s (tier %s)", keywords, theme, duration, moods, tier.name)
+            
+            # Generate story
+            with span('story'):
+                story_text = story_gen.create_story(
+                    keywords=keywords,
+                    theme=theme,
+                    target_duration=duration,
+                    preferred_moods=moods,
+                    word_scale=tier.word_scale,
+                    enhance=tier.enhance_story
+                )
+            
+            if not story_text or "Error" in story_text:
+                return jsonify({
+                    'success': False,
+                    'error': 'Failed to generate story. Please try again.'
+                }), 500
+            
+            logging.info("📝 Story generated successfully")
+            
+            # Analyze emotions
+            with span('emotions'):
+                emotional_segments = emotion_analyzer.analyze_story_emotions(
+                    story_text, 
+                    preferred_moods=moods
+                )
+            
+            logging.info("🎭 Emotions analyzed: %d segments", len(emotional_segments))
+            
+            # Generate audio with Murf AI
+            story_id = uuid.uuid4().hex[:12]
+            audio_filename = f"story_{story_id}.mp3"
+            audio_path = os.path.join(current_app.config['UPLOAD_FOLDER'], audio_filename)
+            voice_id = None
+            audio_url = None
+            
+            if tier.audio:
+                try:
+                    logging.info("🎵 Starting audio generation...")
+                    tracks = []
+                    if tier.segmented_audio:
+                        voice_id = audio_processor.generate_segmented_audio(
+                            emotional_segments, 
+                            output_path=audio_path,
+                            theme=theme,
+                            on_track=tracks.append
+                        )
+                    else:
+                        # One call for the whole story is cheaper than a call per segment
+                        voice_id = audio_processor.generate_emotional_audio(
+                            emotional_segments, 
+                            output_path=audio_path,
+                            theme=theme
+                        )
+                    audio_url, audio_path = _publish_audio(story_id, audio_path)
+                    logging.info("🎵 Audio generated successfully: %s", audio_filename)
+                    _prepare_variants(story_id, audio_path, tracks[0] if tracks else None)
+                    _sweep_audio_caches()
+                except Exception as audio_error:
+                    logging.error(f"Audio generation failed: {audio_error}")
+                    # Return story without audio if audio generation fails
+                    audio_url = None
+                    audio_path = None
+            else:
+                logging.info("⏭️ Skipping narration under load")
+                audio_path = None
         
-        logging.info("📝 Story generated successfully")
+        record = {
+            'id': story_id,
+            'request_key': request_key,
+            'created_at': time.time(),
+            'keywords': keywords,
+            'theme': theme,
+            'duration': duration,
+            'moods': moods,
+            'story': story_text,
+            'segments': [segment.to_dict() for segment in emotional_segments],
+            'voice_id': voice_id,
+            'audio_path': audio_path,
+            'audio_url': audio_url,
+            'timings': _stage_timings()
+        }
+        if story_store:
+            story_store.save(record)
+        _count('stories_generated')
+        if tier.level:
+            _count(f'stories_tier_{tier.name}')
+        if tier.audio and not audio_url:
+            _count('audio_failures')
         
-        # Analyze emotions
-        emotional_segments = emotion_analyzer.analyze_story_emotions(
-            story_text, 
-            preferred_moods=moods
-        )
+        message = None
+        if not tier.audio:
+            message = 'Story generated successfully! Narration is skipped while the service is busy.'
+        response = _story_response(record, message=message)
+        response['quality_tier'] = tier.name
+        if _wants_timings(data):
+            response['timings'] = record['timings']
+        return jsonify(response)
         
-        logging.info(f"🎭 Emotions analyzed: {len(emotional_segments)} segments")
+    except Exception as e:
+        logging.error(f"❌ Error in generate_story: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Internal server error: {str(e)}'
+        }), 500
+
+@api_bp.route('/stories/<story_id>', methods=['GET'])
+def get_story(story_id):
+    """Serve a previously generated story from the store"""
+    if not story_store:
+        return jsonify({
+            'success': False,
+            'error': 'Story store not available.'
+        }), 500
+    
+    record = story_store.get(story_id)
+    if not record:
+        return jsonify({
+            'success': False,
+            'error': 'Story not found'
+        }), 404
+    
+    response = _story_response(record, message='Story loaded from history.')
+    response.update({
+        'keywords': record['keywords'],
+        'theme': record['theme'],
+        'moods': record['moods'],
+        'voice_id': record.get('voice_id'),
+        'segments': record['segments'],
+        'timings': record['timings'],
+        'created_at': record['created_at']
+    })
+    return jsonify(response)
+
+@api_bp.route('/stories', methods=['GET'])
+def list_stories():
+    """Paginated story history, newest first"""
+    if not story_store:
+        return jsonify({
+            'success': False,
+            'error': 'Story store not available.'
+        }), 500
+    
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'page and per_page must be integers'
+        }), 400
+    
+    request_key = request.args.get('request_key')
+    stories = story_store.list_recent(limit=per_page, offset=(page - 1) * per_page, request_key=request_key)
+    total = story_store.count(request_key=request_key)
+    
+    return jsonify({
+        'success': True,
+        'stories': stories,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'has_more': page * per_page < total
+    })
+
+@api_bp.route('/stories/<story_id>/edit', methods=['POST'])
+@profile_request
+def edit_story(story_id):
+    """Re-narrate an edited story, only synthesizing segments whose text changed"""
+    if not all([emotion_analyzer, audio_processor, story_store]):
+        return jsonify({
+            'success': False,
+            'error': 'AI services not properly initialized. Check API keys and dependencies.'
+        }), 500
+    
+    try:
+        original = story_store.get(story_id)
+        if not original:
+            return jsonify({
+                'success': False,
+                'error': 'Story not found'
+            }), 404
         
-        # Generate audio with Murf AI
-        audio_filename = f"story_{uuid.uuid4().hex[:8]}.mp3"
-        audio_path = os.path.join(current_app.config['UPLOAD_FOLDER'], audio_filename)
+        data = request.get_json()
+        revised_text = (data or {}).get('story', '').strip()
+        if not revised_text:
+            return jsonify({
+                'success': False,
+                'error': 'Revised story text is required'
+            }), 400
         
-        try:
-            logging.info("🎵 Starting audio generation...")
-            audio_processor.generate_emotional_audio(
-                emotional_segments, 
-                output_path=audio_path,
-                theme=theme
-            )
-            audio_url = f'/static/audio/generated/{audio_filename}'
-            logging.info(f"🎵 Audio generated successfully: {audio_filename}")
-        except Exception as audio_error:
-            logging.error(f"Audio generation failed: {audio_error}")
-            # Return story without audio if audio generation fails
+        # Edits synthesize audio too, so they count toward load like new stories
+        with quality_policy.admit(minutes=original['duration']) as tier:
+            logging.info("✏️ Editing story %s (tier %s)", story_id, tier.name)
+            
+            previous_segments = [Segment.from_dict(seg) for seg in original['segments']]
+            with span('emotions'):
+                revised_segments = emotion_analyzer.analyze_story_emotions(
+                    revised_text,
+                    preferred_moods=original['moods']
+                )
+            
+            new_id = uuid.uuid4().hex[:12]
+            audio_filename = f"story_{new_id}.mp3"
+            audio_path = os.path.join(current_app.config['UPLOAD_FOLDER'], audio_filename)
+            voice_id = original.get('voice_id')
+            segments = revised_segments
             audio_url = None
+            stats = {}
+            
+            if tier.audio:
+                try:
+                    tracks = []
+                    segments, voice_id, stats = audio_processor.renarrate_segments(
+                        previous_segments,
+                        revised_segments,
+                        output_path=audio_path,
+                        theme=original['theme'],
+                        voice_id=voice_id,
+                        on_track=tracks.append
+                    )
+                    audio_url, audio_path = _publish_audio(new_id, audio_path)
+                    logging.info("🎵 Edited audio generated: %s %s", audio_filename, stats)
+                    _prepare_variants(new_id, audio_path, tracks[0] if tracks else None)
+                    _sweep_audio_caches()
+                except Exception as audio_error:
+                    logging.error(f"Audio re-narration failed: {audio_error}")
+                    segments = revised_segments
+                    audio_url = None
+                    audio_path = None
+            else:
+                logging.info("⏭️ Skipping re-narration under load")
+                audio_path = None
         
-        return jsonify({
-            'success': True,
-            'story': story_text,
+        record = {
+            'id': new_id,
+            'request_key': original['request_key'],
+            'created_at': time.time(),
+            'keywords': original['keywords'],
+            'theme': original['theme'],
+            'duration': original['duration'],
+            'moods': original['moods'],
+            'story': revised_text,
+            'segments': [segment.to_dict() for segment in segments],
+            'voice_id': voice_id,
+            'audio_path': audio_path,
             'audio_url': audio_url,
-            'duration_estimate': f"{duration} minutes",
-            'emotions_used': list(set([seg['emotion'] for seg in emotional_segments])),
-            'segments_count': len(emotional_segments),
-            'word_count': len(story_text.split()),
-            'message': 'Story and audio generated successfully!' if audio_url else 'Story generated successfully! Audio generation failed.'
-        })
+            'timings': _stage_timings()
+        }
+        story_store.save(record)
+        _count('stories_edited')
+        if tier.audio and not audio_url:
+            _count('audio_failures')
+        
+        message = None
+        if audio_url:
+            message = f"Story updated: {stats['segments_synthesized']} of {len(segments)} segments re-narrated."
+        elif not tier.audio:
+            message = 'Story updated! Narration is skipped while the service is busy.'
+        response = _story_response(record, message=message)
+        response.update(stats)
+        response['edited_from'] = story_id
+        response['quality_tier'] = tier.name
+        if _wants_timings(data):
+            response['timings'] = record['timings']
+        return jsonify(response)
         
     except Exception as e:
-        logging.error(f"❌ Error in generate_story: {e}")
+        logging.error(f"❌ Error in edit_story: {e}")
         return jsonify({
             'success': False,
             'error': f'Internal server error: {str(e)}'
         }), 500
+
+@api_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Counters aggregated across all worker processes"""
+    if not shared_state:
+        return jsonify({
+            'success': False,
+            'error': 'Shared state not available.'
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'counters': shared_state.counters(),
+        'murf_keys': audio_processor.key_pool.usage() if audio_processor and audio_processor.key_pool else {},
+        'quality': quality_policy.status()
+    })
+
+@api_bp.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Stored profile report; ?format=collapsed returns flamegraph-ready stacks"""
+    report = load_profile(profile_id)
+    if not report:
+        return jsonify({
+            'success': False,
+            'error': 'Profile not found'
+        }), 404
+    
+    if request.args.get('format') == 'collapsed':
+        return Response(report['collapsed'] + '\n', mimetype='text/plain')
+    
+    report['success'] = True
+    return jsonify(report)
+
+@api_bp.route('/audio/<blob_id>', methods=['GET'])
+def serve_audio(blob_id):
+    """Serve narration from packed storage, honouring Range requests"""
+    view = blob_store.get(blob_id) if blob_store else None
+    if view is None:
+        return jsonify({
+            'success': False,
+            'error': 'Audio not found'
+        }), 404
+    
+    return _serve_view(view, 'audio/mpeg')
+
+@api_bp.route('/stories/<story_id>/audio', methods=['GET'])
+def story_audio(story_id):
+    """Serve a story's narration in the format negotiated with the client"""
+    record = story_store.get(story_id) if story_store else None
+    if not record or not record.get('audio_url'):
+        return jsonify({
+            'success': False,
+            'error': 'Audio not found'
+        }), 404
+    
+    # Only a missing source is a 404; a failed transcode falls back to the original
+    if blob_store:
+        source_missing = blob_store.get(story_id) is None
+    else:
+        source_missing = not os.path.exists(record.get('audio_path') or '')
+    if source_missing:
+        return jsonify({
+            'success': False,
+            'error': 'Audio not found'
+        }), 404
+    
+    variant = negotiate_variant(request.args.get('format'), request.accept_mimetypes)
+    try:
+        response = _serve_story_variant(record, story_id, variant)
+    except Exception as e:
+        if variant == ORIGINAL_VARIANT:
+            return _audio_error(story_id, e)
+        # The source exists, so this is a failed transcode (pydub raises
+        # FileNotFoundError when ffmpeg is missing): serve the original instead
+        logging.warning("Could not encode %s audio for %s, serving the original: %s", variant, story_id, e)
+        variant = ORIGINAL_VARIANT
+        try:
+            response = _serve_story_variant(record, story_id, variant)
+        except Exception as e:
+            return _audio_error(story_id, e)
+        # Don't let browsers or edge caches keep the stand-in under this variant's URL
+        response.headers['Cache-Control'] = 'no-store'
+    
+    response.headers['Vary'] = 'Accept'
+    response.headers['X-Audio-Format'] = variant
+    return response
+
+def _audio_error(story_id, error):
+    if isinstance(error, FileNotFoundError):
+        # The source vanished after it was checked (expired or deleted)
+        return jsonify({
+            'success': False,
+            'error': 'Audio not found'
+        }), 404
+    logging.error(f"❌ Error serving audio for {story_id}: {error}")
+    return jsonify({
+        'success': False,
+        'error': 'Audio unavailable'
+    }), 500
+
+def _serve_story_variant(record, story_id, variant):
+    """Response for one variant of a story's narration, transcoding it if it wasn't prepared"""
+    mimetype = variant_mimetype(variant)
+    source_path = None if blob_store else os.path.abspath(record['audio_path'])
+    if variant == ORIGINAL_VARIANT:
+        found = blob_store.get(story_id) if blob_store else source_path
+    else:
+        cache_key, lookup, store = _variant_cache(story_id, source_path, variant)
+        found = audio_formatter.cached_variant(cache_key, variant, lookup, store, _source_loader(story_id, source_path))
+    
+    if blob_store:
+        if found is None:
+            raise FileNotFoundError(story_id)
+        return _serve_view(found, mimetype)
+    return send_file(found, mimetype=mimetype, conditional=True, max_age=31536000)
+
+def _prepare_variants(story_id, audio_path, track=None):
+    """Start encoding the smaller variants now, so the first play doesn't wait on a transcode"""
+    source_path = None if blob_store else os.path.abspath(audio_path)
+    jobs = []
+    for variant in AUDIO_VARIANTS:
+        if variant != ORIGINAL_VARIANT:
+            cache_key, lookup, store = _variant_cache(story_id, source_path, variant)
+            jobs.append((cache_key, variant, lookup, store))
+    if not audio_formatter.prepare(jobs, _source_loader(story_id, source_path), track=track):
+        logging.info("⏳ Variant encoders busy; %s will be encoded on first request", story_id)
+
+def _variant_cache(story_id, source_path, variant):
+    """Cache key, lookup and store for one encoded variant of a story's narration"""
+    if blob_store:
+        cache_key = f"{story_id}.{AUDIO_VARIANTS[variant]['key']}"
+        return cache_key, lambda: blob_store.get(cache_key), lambda data: blob_store.put(cache_key, data)
+    
+    variant_dir = os.path.join(os.path.dirname(source_path), 'variants')
+    path = os.path.join(variant_dir, f"story_{story_id}.{variant}.{AUDIO_VARIANTS[variant]['extension']}")
+    return path, lambda: path if os.path.exists(path) else None, lambda data: _write_variant(path, data)
+
+def _source_loader(story_id, source_path):
+    """Callable returning the original narration's bytes, or None if it's gone"""
+    if blob_store:
+        return lambda: blob_store.get(story_id)
+    
+    def load():
+        try:
+            with open(source_path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    return load
+
+def _write_variant(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _serve_view(view, mimetype):
+    """Stream a memory-mapped blob, honouring Range requests"""
+    length = len(view)
+    start, stop = 0, length
+    status = 200
+    if request.range:
+        byte_range = request.range.range_for_length(length)
+        if byte_range is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{length}'})
+        start, stop = byte_range
+        status = 206
+    
+    response = Response(
+        BlobStore.iter_chunks(view[start:stop]),
+        status=status,
+        mimetype=mimetype,
+        direct_passthrough=True
+    )
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Content-Length'] = str(stop - start)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+    return response
@@ -15,7 +15,7 @@ def health_check():
         'service': 'NarrateAI',
         'environment_vars': {
             'GEMINI_API_KEY': bool(os.environ.get('GEMINI_API_KEY')),
-            'MURF_API_KEY': bool(os.environ.get('MURF_API_KEY'))
+            'MURF_API_KEY': bool(os.environ.get('MURF_API_KEY') or os.environ.get('MURF_API_KEYS'))
         }
     }
     return jsonify(services_status)
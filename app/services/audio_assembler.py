@@ -0,0 +1,176 @@
+import io
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+import numpy as np
+
+
+class AudioAssembler:
+    """Stitch narration clips into one track entirely in NumPy.
+
+    Clips are decoded once to 16-bit mono PCM and kept in a bounded in-memory
+    LRU (AUDIO_PCM_CACHE_MB per process), laid into a single preallocated
+    float32 buffer with the dramatic pauses as untouched zeros, and the
+    finished track is encoded once. Decoding and encoding go through pydub,
+    which needs ffmpeg.
+    """
+
+    def __init__(self, sample_rate: int = 24000, crossfade_ms: int = 30,
+                 target_dbfs: float = -20.0, max_gain_db: float = 12.0, bitrate: str = '64k',
+                 cache_mb: float = None):
+        self.sample_rate = sample_rate
+        self.crossfade_samples = int(sample_rate * crossfade_ms / 1000)
+        self.target_rms = 10 ** (target_dbfs / 20)
+        self.max_gain = 10 ** (max_gain_db / 20)
+        self.bitrate = bitrate
+
+        # Shared fade ramps, applied to clip edges by in-place multiplication
+        self._fade_in = np.linspace(0.0, 1.0, self.crossfade_samples, dtype=np.float32)
+        self._fade_out = self._fade_in[::-1].copy()
+
+        # Decoded clips by path, least recently used first
+        self.cache_bytes = int((cache_mb if cache_mb is not None else
+                                float(os.environ.get('AUDIO_PCM_CACHE_MB', 64))) * 1024 * 1024)
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._cache_lock = threading.Lock()
+
+    def stitch(self, pcm: List[np.ndarray], pauses: List[float], output_path: str, format: str = 'mp3') -> np.ndarray:
+        """Assemble decoded clips into output_path, returning the float32 track"""
+        track = self.assemble(pcm, pauses)
+
+        tmp_path = self._tmp_path(output_path)
+        with open(tmp_path, 'wb') as f:
+            f.write(self.encode(track, format=format))
+        os.replace(tmp_path, output_path)
+        return track
+
+    def load_clip(self, clip_path: str, data: bytes = None) -> np.ndarray:
+        """Return a clip as int16 PCM, decoding it (from data when given) only if it isn't cached"""
+        with self._cache_lock:
+            samples = self._cache.get(clip_path)
+            if samples is not None:
+                self._cache.move_to_end(clip_path)
+                return samples
+
+        if data is None:
+            with open(clip_path, 'rb') as f:
+                data = f.read()
+        samples = self.decode(data)
+        # Cached arrays are shared between requests
+        samples.flags.writeable = False
+
+        if samples.nbytes <= self.cache_bytes:
+            with self._cache_lock:
+                previous = self._cache.pop(clip_path, None)
+                if previous is not None:
+                    self._cached_bytes -= previous.nbytes
+                self._cache[clip_path] = samples
+                self._cached_bytes += samples.nbytes
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= evicted.nbytes
+        return samples
+
+    @staticmethod
+    def _tmp_path(path: str) -> str:
+        # Unique per thread: gthread workers decode and stitch concurrently
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def decode(self, data: bytes, format: str = 'mp3') -> np.ndarray:
+        """Decode compressed audio to mono int16 PCM at the assembler's sample rate"""
+        from pydub import AudioSegment
+
+        segment = AudioSegment.from_file(io.BytesIO(data), format=format)
+        segment = segment.set_channels(1).set_frame_rate(self.sample_rate).set_sample_width(2)
+        return np.frombuffer(segment.raw_data, dtype=np.int16).copy()
+
+    def encode(self, track: np.ndarray, format: str = 'mp3', bitrate: str = None,
+               sample_rate: int = None, codec: str = None) -> bytes:
+        """Encode a float32 track (or int16 PCM) once, at the end of assembly"""
+        from pydub import AudioSegment
+
+        pcm = track if track.dtype == np.int16 else self.to_int16(track)
+        segment = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=self.sample_rate, channels=1)
+        if sample_rate and sample_rate != self.sample_rate:
+            segment = segment.set_frame_rate(sample_rate)
+
+        buffer = io.BytesIO()
+        segment.export(buffer, format=format, bitrate=bitrate or self.bitrate, codec=codec)
+        return buffer.getvalue()
+
+    def assemble(self, clips: List[np.ndarray], pauses: List[float]) -> np.ndarray:
+        """Lay int16 clips into one normalized float32 track.
+
+        Each clip is written by slicing into a buffer allocated once up front.
+        Clips separated by a pause get short fades at their edges; clips with
+        no pause between them overlap, and both sides of the overlap fade over
+        exactly its length, which makes it an equal-gain crossfade.
+        """
+        if not clips:
+            return np.zeros(0, dtype=np.float32)
+
+        fade = self.crossfade_samples
+        starts = []
+        # overlaps[i] is how far clip i overlaps clip i - 1
+        overlaps = [0] * (len(clips) + 1)
+        position = 0
+        for i, clip in enumerate(clips):
+            if i > 0:
+                pause = int(pauses[i - 1] * self.sample_rate) if pauses[i - 1] > 0 else 0
+                # Never more than half of either clip, so a short clip can't be swallowed whole
+                overlaps[i] = min(fade, len(clip) // 2, len(clips[i - 1]) // 2) if pause == 0 else 0
+                position += pause - overlaps[i]
+            starts.append(position)
+            position += len(clip)
+
+        track = np.zeros(position, dtype=np.float32)
+        scale = np.float32(1.0 / 32768)
+
+        for i, (start, clip) in enumerate(zip(starts, clips)):
+            length = len(clip)
+            if length == 0:
+                continue
+            view = track[start:start + length]
+
+            # Normalize a float32 copy of the clip before adding it to the track
+            samples = clip.astype(np.float32)
+            rms = float(np.sqrt(np.dot(samples, samples) / length)) * scale
+            gain = min(self.target_rms / rms, self.max_gain) if rms > 0 else 1.0
+            samples *= np.float32(gain * scale)
+
+            edge = min(fade, length // 2)
+            head = overlaps[i] or edge
+            tail = overlaps[i + 1] or edge
+            if head:
+                samples[:head] *= self._ramps(head)[0]
+            if tail:
+                samples[-tail:] *= self._ramps(tail)[1]
+
+            view += samples
+
+        np.clip(track, -1.0, 1.0, out=track)
+        return track
+
+    def _ramps(self, length: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Fade-in and fade-out ramps of the given length, each running the full 0 to 1"""
+        if length == self.crossfade_samples:
+            return self._fade_in, self._fade_out
+        # Clips shorter than two fades get their own shorter ramps so overlaps still sum to one
+        fade_in = np.linspace(0.0, 1.0, length, dtype=np.float32)
+        return fade_in, fade_in[::-1]
+
+    @staticmethod
+    def to_int16(track: np.ndarray) -> np.ndarray:
+        return (track * 32767).astype(np.int16)
+
+
+def stitch_by_concatenation(clip_paths: List[str], output_path: str):
+    """Join MP3 clips without decoding; MP3 frames are self-contained so they concatenate cleanly"""
+    with open(output_path, 'wb') as out:
+        for clip_path in clip_paths:
+            with open(clip_path, 'rb') as clip:
+                out.write(clip.read())
+    logging.debug("Concatenated %d clips into %s", len(clip_paths), output_path)
@@ -0,0 +1,155 @@
+import threading
+import contextvars
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.services.audio_assembler import AudioAssembler
+
+# Delivery variants, smallest first. 'mp3' is the narration exactly as generated;
+# 'key' is the short suffix variants are cached under.
+AUDIO_VARIANTS = {
+    'opus': {
+        'key': 'op',
+        'mimetype': 'audio/ogg',
+        'codecs': 'opus',
+        'format': 'ogg',
+        'codec': 'libopus',
+        'bitrate': '24k',
+        'sample_rate': 24000,
+        'extension': 'ogg'
+    },
+    'mp3-low': {
+        'key': 'ml',
+        'mimetype': 'audio/mpeg',
+        'codecs': None,
+        'format': 'mp3',
+        'codec': None,
+        'bitrate': '48k',
+        'sample_rate': 22050,
+        'extension': 'mp3'
+    },
+    'mp3': {
+        'key': '',
+        'mimetype': 'audio/mpeg',
+        'codecs': None,
+        'format': 'mp3',
+        'codec': None,
+        'bitrate': None,
+        'sample_rate': None,
+        'extension': 'mp3'
+    }
+}
+
+ORIGINAL_VARIANT = 'mp3'
+
+
+def negotiate_variant(requested: Optional[str], accept_mimetypes) -> str:
+    """Pick a delivery variant from an explicit ?format= or the Accept header.
+
+    Wildcard Accept headers get the original MP3, since every client can
+    play it; smaller variants are only sent when asked for by name or type.
+    """
+    if requested in AUDIO_VARIANTS:
+        return requested
+
+    if accept_mimetypes:
+        best = accept_mimetypes.best_match(['audio/ogg', 'audio/mpeg'], default=None)
+        if best == 'audio/ogg' and accept_mimetypes['audio/ogg'] > accept_mimetypes['audio/mpeg']:
+            return 'opus'
+    return ORIGINAL_VARIANT
+
+
+def variant_mimetype(variant: str) -> str:
+    spec = AUDIO_VARIANTS[variant]
+    return f"{spec['mimetype']}; codecs={spec['codecs']}" if spec['codecs'] else spec['mimetype']
+
+
+class AudioFormatter:
+    """Produce and cache encoded variants of finished narrations.
+
+    Variants are encoded straight from the stitched float32 track when it is
+    at hand, on a background thread right after the narration is published,
+    so the first play doesn't wait on ffmpeg and nothing is encoded twice
+    lossily. Anything not prepared that way is transcoded from the stored MP3
+    on first request.
+    """
+
+    def __init__(self, assembler: AudioAssembler = None, max_background: int = 2):
+        self.assembler = assembler or AudioAssembler()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Each background job holds a whole track in memory, so only a few run at once
+        self._background_slots = threading.BoundedSemaphore(max_background)
+
+    def encode(self, track: np.ndarray, variant: str) -> bytes:
+        """Encode a track at the assembler's sample rate into the given variant"""
+        spec = AUDIO_VARIANTS[variant]
+        return self.assembler.encode(
+            track,
+            format=spec['format'],
+            bitrate=spec['bitrate'],
+            sample_rate=spec['sample_rate'],
+            codec=spec['codec']
+        )
+
+    def transcode(self, data: bytes, variant: str) -> bytes:
+        """Re-encode an MP3 narration into the given variant"""
+        return self.encode(self.assembler.decode(data), variant)
+
+    def cached_variant(self, cache_key: str, variant: str, lookup: Callable, store: Callable, load_source: Callable,
+                       track: np.ndarray = None):
+        """Return lookup() for a variant, encoding and storing it first if it doesn't exist.
+
+        The variant is encoded from track when given, otherwise transcoded
+        from load_source(). Concurrent callers for the same variant wait for
+        a single encode.
+        """
+        found = lookup()
+        if found is not None:
+            return found
+
+        with self._lock_for(cache_key):
+            found = lookup()
+            if found is None:
+                logging.info("Encoding %s variant for %s", variant, cache_key)
+                if track is not None:
+                    store(self.encode(track, variant))
+                else:
+                    source = load_source()
+                    if source is None:
+                        raise FileNotFoundError(cache_key)
+                    store(self.transcode(bytes(source), variant))
+                found = lookup()
+
+        with self._locks_guard:
+            self._locks.pop(cache_key, None)
+        return found
+
+    def prepare(self, jobs: List[Tuple[str, str, Callable, Callable]], load_source: Callable,
+                track: np.ndarray = None) -> bool:
+        """Encode (cache_key, variant, lookup, store) jobs on a background thread.
+
+        Returns False, leaving the variants to be encoded on first request,
+        when the background encoders are all busy.
+        """
+        if not self._background_slots.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                for cache_key, variant, lookup, store in jobs:
+                    try:
+                        self.cached_variant(cache_key, variant, lookup, store, load_source, track=track)
+                    except Exception as e:
+                        logging.warning("Could not prepare %s variant for %s: %s", variant, cache_key, e)
+            finally:
+                self._background_slots.release()
+
+        # Log lines stay attributed to the request that published the narration
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name='audio-variants', daemon=True).start()
+        return True
+
+    def _lock_for(self, cache_key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(cache_key, threading.Lock())
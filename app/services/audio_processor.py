@@ -1,16 +1,67 @@
-import requests
 import os
-from typing import List, Dict
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import hashlib
+import threading
 import logging
 import re
+import numpy as np
+from app.services.segment import Segment, Emotion, VoiceStyle, reuse_unchanged_segments
+from app.services.audio_assembler import AudioAssembler, stitch_by_concatenation
+from app.services.shared_state import SharedState
+from app.services.murf_keys import MurfKeyPool
+from app.services.tts_backends import TTSBackend, MurfBackend, LocalBackend, HedgedBackend
+from app.utils.tracing import span
+
+# Delivery tables keyed by Emotion, shared by every AudioProcessor instance
+_STYLE_MAPPING = {
+    Emotion.EXCITEMENT: VoiceStyle.EXCITED,
+    Emotion.JOY: VoiceStyle.CHEERFUL,
+    Emotion.HAPPINESS: VoiceStyle.CHEERFUL,
+    Emotion.SADNESS: VoiceStyle.SAD,
+    Emotion.ANGER: VoiceStyle.ANGRY,
+    Emotion.FEAR: VoiceStyle.TERRIFIED,
+    Emotion.SURPRISE: VoiceStyle.EXCITED,
+    Emotion.CALM: VoiceStyle.CALM,
+    Emotion.MYSTERIOUS: VoiceStyle.CONVERSATIONAL,
+    Emotion.NEUTRAL: VoiceStyle.CONVERSATIONAL
+}
+
+_BASE_SPEEDS = {
+    Emotion.EXCITEMENT: 1.1, Emotion.FEAR: 0.9, Emotion.SADNESS: 0.8, Emotion.ANGER: 1.0,
+    Emotion.JOY: 1.1, Emotion.MYSTERIOUS: 0.9, Emotion.CALM: 0.95, Emotion.SURPRISE: 1.2, Emotion.NEUTRAL: 1.0
+}
+
+_PITCH_MAP = {
+    Emotion.EXCITEMENT: 1.1, Emotion.JOY: 1.05, Emotion.FEAR: 1.2, Emotion.SURPRISE: 1.3,
+    Emotion.ANGER: 1.05, Emotion.SADNESS: 0.95, Emotion.MYSTERIOUS: 0.95, Emotion.CALM: 1.0, Emotion.NEUTRAL: 1.0
+}
+
+_EMPHASIS_LEVELS = {
+    Emotion.EXCITEMENT: 'strong', Emotion.ANGER: 'strong', Emotion.FEAR: 'moderate', Emotion.SURPRISE: 'strong',
+    Emotion.JOY: 'moderate', Emotion.SADNESS: 'reduced', Emotion.MYSTERIOUS: 'moderate', Emotion.CALM: 'none',
+    Emotion.NEUTRAL: 'none'
+}
+
+_BASE_PAUSES = {
+    Emotion.SADNESS: 1.2, Emotion.MYSTERIOUS: 1.0, Emotion.FEAR: 0.8, Emotion.EXCITEMENT: 0.3,
+    Emotion.JOY: 0.4, Emotion.ANGER: 0.3, Emotion.SURPRISE: 0.5, Emotion.CALM: 0.6, Emotion.NEUTRAL: 0.5
+}
 
 class AudioProcessor:
-    def __init__(self):
-        self.murf_api_key = os.environ.get('MURF_API_KEY')
-        if not self.murf_api_key:
-            raise ValueError("MURF_API_KEY environment variable not set")
+    def __init__(self, shared_state: SharedState = None):
+        # Voice catalog cache and usage counters shared across worker processes
+        self.shared_state = shared_state
         
-        self.murf_base_url = "https://api.murf.ai/v1"
+        # Speech doesn't need more than 24kHz; assemble at whatever rate Murf renders
+        self.sample_rate = int(os.environ.get('MURF_SAMPLE_RATE', 24000))
+        self.assembler = AudioAssembler(sample_rate=self.sample_rate)
+        
+        self.key_pool = None
+        self.backend = self._create_backend()
+        self.voice_cache_ttl = 3600
         
         # Safe fallback voices
         self.fallback_voices = [
@@ -21,16 +72,41 @@ class AudioProcessor:
             'en-US-ruby'
         ]
         
+        # Concurrent Murf calls when synthesizing a story segment by segment;
+        # each key brings its own rate limit, so allow more calls per key
+        keys = len(self.key_pool) if self.key_pool else 1
+        self.max_parallel_requests = int(os.environ.get('MURF_MAX_PARALLEL_REQUESTS', 4 * keys))
+        
         logging.info("Enhanced Audio Processor initialized for storytelling")
     
-    def generate_emotional_audio(self, emotional_segments: List[Dict], output_path: str, theme: str = 'adventure'):
-        """Generate highly emotional storytelling audio"""
+    def _create_backend(self) -> TTSBackend:
+        """Build the TTS backend named by TTS_BACKEND, hedged unless TTS_HEDGE_PERCENTILE is 0"""
+        if os.environ.get('TTS_BACKEND', 'murf') == 'local':
+            backend = LocalBackend(self.assembler, sample_rate=self.sample_rate)
+        else:
+            # Every Murf call takes its API key from the pool
+            self.key_pool = MurfKeyPool(shared_state=self.shared_state)
+            backend = MurfBackend(self.key_pool, sample_rate=self.sample_rate)
+        
+        percentile = float(os.environ.get('TTS_HEDGE_PERCENTILE', 95))
+        if not percentile:
+            return backend
+        return HedgedBackend(
+            backend,
+            percentile=percentile,
+            max_ratio=float(os.environ.get('TTS_HEDGE_MAX_RATIO', 0.1)),
+            shared_state=self.shared_state
+        )
+    
+    def generate_emotional_audio(self, emotional_segments: Iterable[Segment], output_path: str, theme: str = 'adventure') -> str:
+        """Generate highly emotional storytelling audio and return the voice ID used"""
         try:
             # Get available voices and select the best one
-            available_voices = self._get_available_voices()
-            voice_id = self._select_best_voice(theme, available_voices)
+            with span('voice'):
+                available_voices = self._get_available_voices()
+                voice_id = self._select_best_voice(theme, available_voices)
             
-            logging.info(f"Using voice ID: {voice_id} for theme: {theme}")
+            logging.info("Using voice ID: %s for theme: %s", voice_id, theme)
             
             # Process segments for storytelling
             processed_segments = self._enhance_segments_for_storytelling(emotional_segments, theme)
@@ -43,44 +119,187 @@ class AudioProcessor:
             )
             
             # Save audio to file
-            with open(output_path, 'wb') as f:
+            with span('write'), open(output_path, 'wb') as f:
                 f.write(audio_data)
             
-            logging.info(f"Emotional storytelling audio generated: {output_path}")
+            logging.info("Emotional storytelling audio generated: %s", output_path)
+            return voice_id
             
         except Exception as e:
             logging.error(f"Error in generate_emotional_audio: {e}")
             raise
     
-    def _get_available_voices(self) -> List[Dict]:
-        """Get list of available voices from Murf API with better error handling"""
+    def generate_segmented_audio(self, emotional_segments: Iterable[Segment], output_path: str, theme: str = 'adventure',
+                                 on_track: Callable[[np.ndarray], None] = None) -> str:
+        """Synthesize each segment with its own delivery and stitch the clips, returning the voice ID used.
+
+        on_track, if given, receives the stitched float32 track.
+        """
         try:
-            url = f"{self.murf_base_url}/speech/voices"
-            headers = {
-                "api-key": self.murf_api_key,
-                "Content-Type": "application/json"
-            }
+            with span('voice'):
+                available_voices = self._get_available_voices()
+                voice_id = self._select_best_voice(theme, available_voices)
+            
+            logging.info("Using voice ID: %s for theme: %s", voice_id, theme)
+            
+            segments = list(self._enhance_segments_for_storytelling(emotional_segments, theme))
+            synthesized = self._synthesize_and_stitch(segments, output_path, voice_id, on_track)
             
-            response = requests.get(url, headers=headers, timeout=10)
+            logging.info("Segmented storytelling audio generated: %s (%d/%d segments synthesized)", output_path, synthesized, len(segments))
+            return voice_id
             
-            if response.status_code == 200:
-                voices_data = response.json()
-                
-                # Handle different response formats
-                if isinstance(voices_data, list):
-                    voices = voices_data
-                elif isinstance(voices_data, dict):
-                    voices = voices_data.get('voices', voices_data.get('data', []))
-                else:
-                    logging.warning(f"Unexpected voices response format: {type(voices_data)}")
-                    return []
-                
-                logging.info(f"Retrieved {len(voices)} available voices")
-                return voices if isinstance(voices, list) else []
-            else:
-                logging.error(f"Failed to get voices: {response.status_code} - {response.text}")
-                return []
-                
+        except Exception as e:
+            logging.error(f"Error in generate_segmented_audio: {e}")
+            raise
+    
+    def renarrate_segments(self, previous: List[Segment], revised: Iterable[Segment], output_path: str,
+                           theme: str = 'adventure', voice_id: str = None,
+                           on_track: Callable[[np.ndarray], None] = None) -> Tuple[List[Segment], str, Dict]:
+        """Re-narrate an edited story, synthesizing only segments whose text changed.
+
+        Returns the merged segments, the voice ID used and reuse statistics.
+        on_track, if given, receives the stitched float32 track.
+        """
+        try:
+            if not voice_id:
+                with span('voice'):
+                    voice_id = self._select_best_voice(theme, self._get_available_voices())
+            
+            # Clean the revised segments first so they compare against the narrated text
+            revised = list(self._enhance_segments_for_storytelling(revised, theme))
+            segments, changed = reuse_unchanged_segments(previous, revised)
+            synthesized = self._synthesize_and_stitch(segments, output_path, voice_id, on_track)
+            
+            stats = {
+                'segments_changed': changed,
+                'segments_synthesized': synthesized,
+                'segments_reused': len(segments) - synthesized
+            }
+            logging.info("Re-narrated edited story: %s %s", output_path, stats)
+            return segments, voice_id, stats
+            
+        except Exception as e:
+            logging.error(f"Error in renarrate_segments: {e}")
+            raise
+    
+    def _synthesize_and_stitch(self, segments: List[Segment], output_path: str, voice_id: str,
+                               on_track: Callable[[np.ndarray], None] = None) -> int:
+        """Make sure every segment has a clip on disk, then join them into output_path.
+
+        Clips are stored by a hash of everything that affects the audio, so a
+        segment that was narrated recently is never sent to Murf again. The
+        clip directory is a cache that the API sweeps by age. Each clip is
+        decoded on the synthesis pool, right after download for new clips, so
+        the stitch itself only lays out PCM that is already in memory.
+        """
+        clip_dir = os.path.join(os.path.dirname(output_path), 'segments')
+        os.makedirs(clip_dir, exist_ok=True)
+        
+        missing = {}
+        reused = set()
+        for segment in segments:
+            if not segment.text:
+                segment.audio_key = None
+                continue
+            segment.audio_key = self._clip_key(segment, voice_id)
+            try:
+                # Clips are swept by age, so mark reused ones as fresh
+                os.utime(self._clip_path(clip_dir, segment.audio_key))
+                reused.add(segment.audio_key)
+            except FileNotFoundError:
+                missing.setdefault(segment.audio_key, segment)
+        
+        decoded = {}
+        
+        def synthesize(segment: Segment):
+            audio_data = self._call_murf_api(
+                text=segment.text,
+                voice_id=voice_id,
+                style=segment.style,
+                rate=segment.speed,
+                pitch=segment.pitch
+            )
+            clip_path = self._clip_path(clip_dir, segment.audio_key)
+            # Threads of one worker can synthesize the same clip at once
+            tmp_path = f"{clip_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with span('write'):
+                with open(tmp_path, 'wb') as f:
+                    f.write(audio_data)
+                os.replace(tmp_path, clip_path)
+            decoded[segment.audio_key] = self._decode_clip(clip_path, audio_data)
+        
+        def decode(audio_key: str):
+            decoded[audio_key] = self._decode_clip(self._clip_path(clip_dir, audio_key))
+        
+        tasks = [(synthesize, segment) for segment in missing.values()] + [(decode, key) for key in reused]
+        if tasks:
+            workers = max(1, min(self.max_parallel_requests, len(tasks)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Run each call in a copy of this context so its spans and log
+                # lines are attributed to the request that asked for it
+                futures = [pool.submit(contextvars.copy_context().run, task, arg) for task, arg in tasks]
+                # result() re-raises the first synthesis failure
+                for future in futures:
+                    future.result()
+        
+        clips = [(self._clip_path(clip_dir, s.audio_key), s.pause_after) for s in segments if s.audio_key]
+        pcm = [decoded.get(s.audio_key) for s in segments if s.audio_key]
+        with span('stitch'):
+            track = self._stitch_clips(clips, pcm, output_path)
+        if track is not None and on_track is not None:
+            on_track(track)
+        return len(missing)
+    
+    def _decode_clip(self, clip_path: str, data: bytes = None) -> Optional[np.ndarray]:
+        """Decode a clip for assembly, or None if it can't be and the clips must be concatenated"""
+        try:
+            with span('decode'):
+                return self.assembler.load_clip(clip_path, data)
+        except Exception as e:
+            logging.debug("Could not decode clip %s: %s", clip_path, e)
+            return None
+    
+    def _clip_key(self, segment: Segment, voice_id: str) -> str:
+        """Content hash identifying a segment's audio"""
+        fingerprint = f"{voice_id}|{segment.style.value}|{segment.speed:.3f}|{segment.pitch:.3f}|{segment.text}"
+        return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:20]
+    
+    def _clip_path(self, clip_dir: str, audio_key: str) -> str:
+        return os.path.join(clip_dir, f"{audio_key}.mp3")
+    
+    def _stitch_clips(self, clips: List[Tuple[str, float]], pcm: List[Optional[np.ndarray]],
+                      output_path: str) -> Optional[np.ndarray]:
+        """Join (clip_path, pause_after) pairs with dramatic pauses, falling back to plain concatenation.
+
+        Returns the stitched float32 track, or None when the clips were concatenated.
+        """
+        if all(samples is not None for samples in pcm):
+            try:
+                return self.assembler.stitch(pcm, [pause for _, pause in clips], output_path)
+            except Exception as e:
+                # pydub or ffmpeg missing - still ship the narration
+                logging.warning("Audio encoding unavailable, concatenating clips without pauses: %s", e)
+        else:
+            logging.warning("Some clips could not be decoded, concatenating clips without pauses")
+        stitch_by_concatenation([path for path, _ in clips], output_path)
+        return None
+    
+    def _get_available_voices(self) -> List[Dict]:
+        """Get available voices, from the shared cache when another worker already fetched them"""
+        if self.shared_state:
+            try:
+                return self.shared_state.get_or_set(f'{self.backend.name}_voices', self._fetch_available_voices,
+                                                    ttl=self.voice_cache_ttl)
+            except Exception as e:
+                logging.warning(f"Voice cache unavailable: {e}")
+        return self._fetch_available_voices()
+    
+    def _fetch_available_voices(self) -> List[Dict]:
+        """Get list of available voices from the TTS backend with better error handling"""
+        try:
+            voices = self.backend.list_voices()
+            logging.info(f"Retrieved {len(voices)} available voices")
+            return voices
         except Exception as e:
             logging.error(f"Error getting available voices: {e}")
             return []
@@ -122,42 +341,37 @@ class AudioProcessor:
         for pref_name in preferred_names:
             for voice_id in voice_ids:
                 if pref_name.lower() in str(voice_id).lower():
-                    logging.info(f"Selected voice {voice_id} for theme {theme}")
+                    logging.info("Selected voice %s for theme %s", voice_id, theme)
                     return voice_id
         
         # If no preference match, return the first English voice
         for voice_id in voice_ids:
             if 'en' in str(voice_id).lower():
-                logging.info(f"Using fallback English voice {voice_id} for theme {theme}")
+                logging.info("Using fallback English voice %s for theme %s", voice_id, theme)
                 return voice_id
         
         # Ultimate fallback
         selected_voice = voice_ids[0] if voice_ids else self.fallback_voices[0]
-        logging.info(f"Using ultimate fallback voice {selected_voice}")
+        logging.info("Using ultimate fallback voice %s", selected_voice)
         return selected_voice
     
-    def _enhance_segments_for_storytelling(self, segments: List[Dict], theme: str) -> List[Dict]:
-        """Enhance text segments with storytelling elements"""
-        enhanced_segments = []
+    def _enhance_segments_for_storytelling(self, segments: Iterable[Segment], theme: str) -> Iterator[Segment]:
+        """Annotate segments in place with storytelling delivery, yielding each as it is ready"""
+        total = len(segments) if hasattr(segments, '__len__') else None
         
         for i, segment in enumerate(segments):
-            text = segment['text']
-            emotion = segment.get('emotion', 'neutral')
+            emotion = segment.emotion
             
             # Clean text AGGRESSIVELY
-            enhanced_text = self._clean_text_completely(text)
+            with span('clean'):
+                segment.text = self._clean_text_completely(segment.text)
+            segment.style = self._get_advanced_voice_style(emotion, theme)
+            segment.speed = self._get_dynamic_speed(emotion, i, total)
+            segment.pitch = self._get_dynamic_pitch(emotion, theme)
+            segment.emphasis = self._get_emphasis_level(emotion)
+            segment.pause_after = self._get_dramatic_pause(emotion, i, total)
             
-            enhanced_segments.append({
-                'text': enhanced_text,
-                'emotion': emotion,
-                'murf_style': self._get_advanced_voice_style(emotion, theme),
-                'speed': self._get_dynamic_speed(emotion, i, len(segments)),
-                'pitch': self._get_dynamic_pitch(emotion, theme),
-                'emphasis': self._get_emphasis_level(emotion),
-                'pause_after': self._get_dramatic_pause(emotion, i, len(segments))
-            })
-        
-        return enhanced_segments
+            yield segment
     
     def _clean_text_completely(self, text: str) -> str:
         """AGGRESSIVELY clean text for TTS - remove ALL problematic content"""
@@ -239,87 +453,54 @@ class AudioProcessor:
         
         return text
     
-    def _get_advanced_voice_style(self, emotion: str, theme: str) -> str:
+    def _get_advanced_voice_style(self, emotion: Emotion, theme: str) -> VoiceStyle:
         """Get voice style for emotion"""
-        
-        style_mapping = {
-            'excitement': 'excited',
-            'joy': 'cheerful',
-            'happiness': 'cheerful',
-            'sadness': 'sad',
-            'anger': 'angry',
-            'fear': 'terrified',
-            'surprise': 'excited',
-            'calm': 'calm',
-            'mysterious': 'conversational',
-            'neutral': 'conversational'
-        }
-        
-        return style_mapping.get(emotion, 'conversational')
+        return _STYLE_MAPPING.get(emotion, VoiceStyle.CONVERSATIONAL)
     
-    def _get_dynamic_speed(self, emotion: str, position: int, total: int) -> float:
+    def _get_dynamic_speed(self, emotion: Emotion, position: int, total: int) -> float:
         """Get dynamic speed for emotion and story position"""
-        
-        base_speeds = {
-            'excitement': 1.1, 'fear': 0.9, 'sadness': 0.8, 'anger': 1.0,
-            'joy': 1.1, 'mysterious': 0.9, 'calm': 0.95, 'surprise': 1.2, 'neutral': 1.0
-        }
-        
-        return base_speeds.get(emotion, 1.0)
+        return _BASE_SPEEDS.get(emotion, 1.0)
     
-    def _get_dynamic_pitch(self, emotion: str, theme: str) -> float:
+    def _get_dynamic_pitch(self, emotion: Emotion, theme: str) -> float:
         """Get dynamic pitch for emotion"""
-        
-        pitch_map = {
-            'excitement': 1.1, 'joy': 1.05, 'fear': 1.2, 'surprise': 1.3,
-            'anger': 1.05, 'sadness': 0.95, 'mysterious': 0.95, 'calm': 1.0, 'neutral': 1.0
-        }
-        
-        return pitch_map.get(emotion, 1.0)
+        return _PITCH_MAP.get(emotion, 1.0)
     
-    def _get_emphasis_level(self, emotion: str) -> str:
+    def _get_emphasis_level(self, emotion: Emotion) -> str:
         """Get emphasis level for emotional delivery"""
-        
-        emphasis_levels = {
-            'excitement': 'strong', 'anger': 'strong', 'fear': 'moderate', 'surprise': 'strong',
-            'joy': 'moderate', 'sadness': 'reduced', 'mysterious': 'moderate', 'calm': 'none', 'neutral': 'none'
-        }
-        
-        return emphasis_levels.get(emotion, 'none')
+        return _EMPHASIS_LEVELS.get(emotion, 'none')
     
-    def _get_dramatic_pause(self, emotion: str, position: int, total: int) -> float:
+    def _get_dramatic_pause(self, emotion: Emotion, position: int, total: int) -> float:
         """Get pause duration after segment"""
-        
-        base_pauses = {
-            'sadness': 1.2, 'mysterious': 1.0, 'fear': 0.8, 'excitement': 0.3,
-            'joy': 0.4, 'anger': 0.3, 'surprise': 0.5, 'calm': 0.6, 'neutral': 0.5
-        }
-        
-        return base_pauses.get(emotion, 0.5)
+        return _BASE_PAUSES.get(emotion, 0.5)
     
-    def _generate_storytelling_audio(self, segments: List[Dict], voice_id: str, theme: str) -> bytes:
+    def _generate_storytelling_audio(self, segments: Iterable[Segment], voice_id: str, theme: str) -> bytes:
         """Generate audio with storytelling techniques"""
         
-        # Combine all segments into one clean text
-        full_text = ""
+        # Single pass: collect text and accumulate delivery statistics as segments stream in
+        texts = []
+        emotion_counts = Counter()
+        total_speed = 0.0
+        total_pitch = 0.0
         
-        for i, segment in enumerate(segments):
-            text = segment['text']
-            if text:
-                full_text += text
-                if i < len(segments) - 1:
-                    full_text += " "
+        for segment in segments:
+            if segment.text:
+                texts.append(segment.text)
+            emotion_counts[segment.emotion] += 1
+            total_speed += segment.speed
+            total_pitch += segment.pitch
+        
+        count = sum(emotion_counts.values())
         
         # Final cleaning
-        full_text = self._clean_text_completely(full_text)
+        with span('clean'):
+            full_text = self._clean_text_completely(" ".join(texts))
         
         # Get dominant emotion
-        emotions = [seg.get('emotion', 'neutral') for seg in segments]
-        dominant_emotion = max(set(emotions), key=emotions.count) if emotions else 'neutral'
+        dominant_emotion = emotion_counts.most_common(1)[0][0] if emotion_counts else Emotion.NEUTRAL
         
         # Calculate average parameters
-        avg_speed = sum(seg.get('speed', 1.0) for seg in segments) / len(segments)
-        avg_pitch = sum(seg.get('pitch', 1.0) for seg in segments) / len(segments)
+        avg_speed = total_speed / count if count else 1.0
+        avg_pitch = total_pitch / count if count else 1.0
         
         return self._call_murf_api(
             text=full_text,
@@ -330,64 +511,14 @@ class AudioProcessor:
         )
     
     def _call_murf_api(self, text: str, voice_id: str, style: str, rate: float = 1.0, pitch: float = 1.0) -> bytes:
-        """Call Murf API with proper parameters"""
-        
-        url = f"{self.murf_base_url}/speech/generate"
-        
-        payload = {
-            "text": text,
-            "voiceId": voice_id,
-            "format": "MP3",
-            "sampleRate": 24000
-        }
-        
-        if style and style != 'conversational':
-            payload["style"] = style
-        
-        if rate != 1.0:
-            payload["rate"] = rate
-        
-        if pitch != 1.0:
-            payload["pitch"] = pitch
-        
-        headers = {
-            "api-key": self.murf_api_key,
-            "Content-Type": "application/json"
-        }
-        
-        try:
-            logging.info(f"Generating CLEAN audio - Text preview: {text[:100]}...")
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=120)
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                audio_url = None
-                if isinstance(result, dict):
-                    audio_url = (result.get('audioFile') or 
-                               result.get('audio_url') or 
-                               result.get('url') or 
-                               result.get('downloadUrl'))
-                
-                if audio_url:
-                    audio_response = requests.get(audio_url, timeout=60)
-                    if audio_response.status_code == 200:
-                        logging.info("CLEAN audio generated successfully")
-                        return audio_response.content
-                    else:
-                        raise Exception(f"Failed to download audio: {audio_response.status_code}")
-                else:
-                    if hasattr(response, 'content') and len(response.content) > 1000:
-                        return response.content
-                    else:
-                        raise Exception("No audio data in response")
-            else:
-                error_msg = f"Murf API error: {response.status_code} - {response.text}"
-                logging.error(error_msg)
-                raise Exception(error_msg)
-                
-        except requests.exceptions.Timeout:
-            raise Exception("Murf API request timed out")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Network error: {str(e)}")
+        """Synthesize text through the configured TTS backend"""
+        if self.shared_state:
+            try:
+                self.shared_state.incr('murf_requests')
+                self.shared_state.incr('murf_characters', len(text))
+            except Exception as e:
+                logging.warning(f"Could not update Murf usage counters: {e}")
+        
+        # %.100s truncates only if the record is actually written
+        logging.info("Generating CLEAN audio - Text preview: %.100s...", text)
+        return self.backend.synthesize(text, voice_id, style=style, rate=rate, pitch=pitch)
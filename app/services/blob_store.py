@@ -0,0 +1,235 @@
+import os
+import mmap
+import time
+import fcntl
+import struct
+import threading
+import logging
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class BlobStore:
+    """Append-only packed storage for generated audio.
+
+    Blobs are appended to large numbered segment files (``00000001.pack``)
+    and located through a fixed-width binary index written next to each one
+    (``00000001.idx``). Reads are slices of a memory map of the segment, and
+    expiry deletes whole segments, so the directory holds a handful of large
+    files no matter how many stories are stored. Appends take an flock so
+    several worker processes can share one store.
+    """
+
+    # blob id (ascii, NUL padded), offset, length
+    _RECORD = struct.Struct('<16sQI')
+
+    def __init__(self, root_dir: str = None, segment_size: int = None, max_age_hours: float = None):
+        self.root_dir = root_dir or os.environ.get('AUDIO_PACK_DIR', 'instance/audio_packs')
+        self.segment_size = segment_size or int(os.environ.get('AUDIO_PACK_SEGMENT_MB', 256)) * 1024 * 1024
+        # Segments older than this are dropped at startup and whenever a new one starts; 0 keeps everything
+        self.max_age_hours = max_age_hours if max_age_hours is not None else \
+            float(os.environ.get('AUDIO_PACK_MAX_AGE_HOURS', 24))
+        os.makedirs(self.root_dir, exist_ok=True)
+
+        # Held only for lookups in and updates to the in-memory index and maps;
+        # file I/O happens outside it so reads never wait on an append's fsync
+        self._lock = threading.Lock()
+        # Serializes appends and expiry within this process (the flock covers other processes)
+        self._append_lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, int, int]] = {}
+        self._index_read: Dict[int, int] = {}
+        self._maps: Dict[int, mmap.mmap] = {}
+
+        self._refresh_index()
+
+        if self.max_age_hours:
+            self.expire(self.max_age_hours)
+
+        logging.info(f"Packed audio store initialized at {self.root_dir} ({len(self._index)} blobs)")
+
+    def put(self, blob_id: str, data: bytes):
+        """Append a blob to the active segment"""
+        key = self._encode_id(blob_id)
+        rolled = False
+
+        with self._append_lock, open(os.path.join(self.root_dir, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have rolled to a new segment since we last looked
+                self._refresh_index()
+                with self._lock:
+                    seq = max(self._index_read, default=0) or 1
+                pack_path = self._pack_path(seq)
+                if os.path.exists(pack_path) and os.path.getsize(pack_path) + len(data) > self.segment_size:
+                    seq += 1
+                    pack_path = self._pack_path(seq)
+                    rolled = True
+
+                with open(pack_path, 'ab') as pack:
+                    offset = pack.tell()
+                    pack.write(data)
+                    pack.flush()
+                    os.fsync(pack.fileno())
+
+                # The index record is written only once the data is durable
+                with open(self._index_path(seq), 'ab') as index:
+                    index.write(self._RECORD.pack(key, offset, len(data)))
+                    index.flush()
+
+                index_size = os.path.getsize(self._index_path(seq))
+                with self._lock:
+                    self._index_read[seq] = max(self._index_read.get(seq, 0), index_size)
+                    self._index[blob_id] = (seq, offset, len(data))
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        # Rolling over is rare and the old segments are now sealed, so sweep them here
+        if rolled and self.max_age_hours:
+            self.expire(self.max_age_hours)
+
+    def put_file(self, blob_id: str, path: str, remove: bool = True):
+        """Append the contents of a file, deleting the file afterwards by default"""
+        with open(path, 'rb') as f:
+            self.put(blob_id, f.read())
+        if remove:
+            os.remove(path)
+
+    def get(self, blob_id: str) -> Optional[memoryview]:
+        """Return a zero-copy view of a blob, or None if it isn't stored"""
+        location = self._locate(blob_id)
+        if not location:
+            return None
+        seq, offset, length = location
+
+        try:
+            mapped = self._map(seq, offset + length)
+        except FileNotFoundError:
+            # Expired by another process after we indexed it
+            with self._lock:
+                self._forget_segment(seq)
+            return None
+        return memoryview(mapped)[offset:offset + length]
+
+    @staticmethod
+    def iter_chunks(view: memoryview, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield a blob view in chunks straight off the memory map"""
+        for position in range(0, len(view), chunk_size):
+            # WSGI servers only accept bytes, so each chunk is the one copy on the way out
+            yield view[position:position + chunk_size].tobytes()
+
+    def expire(self, max_age_hours: float = 24) -> int:
+        """Drop whole segments whose newest blob is older than max_age_hours"""
+        cutoff = time.time() - max_age_hours * 3600
+        removed = 0
+
+        with self._append_lock, open(os.path.join(self.root_dir, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh_index()
+                with self._lock:
+                    sequences = sorted(self._index_read)
+                active = max(sequences, default=0)
+                for seq in sequences:
+                    pack_path = self._pack_path(seq)
+                    # Never expire the segment currently being appended to
+                    if seq == active or not os.path.exists(pack_path) or os.path.getmtime(pack_path) > cutoff:
+                        continue
+                    for path in (self._index_path(seq), pack_path):
+                        if os.path.exists(path):
+                            os.remove(path)
+                    with self._lock:
+                        self._forget_segment(seq)
+                    removed += 1
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        if removed:
+            logging.info(f"Expired {removed} packed audio segments")
+        return removed
+
+    def _locate(self, blob_id: str) -> Optional[Tuple[int, int, int]]:
+        with self._lock:
+            location = self._index.get(blob_id)
+        if location is None:
+            # Written by another process since our last refresh?
+            self._refresh_index()
+            with self._lock:
+                location = self._index.get(blob_id)
+        return location
+
+    def _map(self, seq: int, needed: int) -> mmap.mmap:
+        """Memory map a segment, remapping the active one when it has grown"""
+        with self._lock:
+            mapped = self._maps.get(seq)
+        if mapped is not None and len(mapped) >= needed:
+            return mapped
+
+        with open(self._pack_path(seq), 'rb') as pack:
+            fresh = mmap.mmap(pack.fileno(), 0, access=mmap.ACCESS_READ)
+        with self._lock:
+            mapped = self._maps.get(seq)
+            # Another thread may have remapped meanwhile; keep whichever map is larger.
+            # Views handed out earlier keep a replaced map alive until released.
+            if mapped is None or len(mapped) < len(fresh):
+                self._maps[seq] = mapped = fresh
+        return mapped
+
+    def _refresh_index(self):
+        """Read index records appended since the last refresh.
+
+        Only index files that have grown are read, and the reads happen
+        outside self._lock, which is taken just to merge the new records.
+        """
+        with self._lock:
+            known = dict(self._index_read)
+
+        present = set()
+        for name in os.listdir(self.root_dir):
+            if name.endswith('.idx'):
+                present.add(int(name[:-4]))
+
+        found = {}
+        read_to = {}
+        for seq in sorted(present):
+            index_path = self._index_path(seq)
+            consumed = known.get(seq, 0)
+            try:
+                if os.path.getsize(index_path) - consumed < self._RECORD.size:
+                    continue
+                with open(index_path, 'rb') as index:
+                    index.seek(consumed)
+                    data = index.read()
+            except FileNotFoundError:
+                # Expired since the listing
+                continue
+            # Ignore a trailing partial record from a concurrent append
+            usable = len(data) - len(data) % self._RECORD.size
+            for key, offset, length in self._RECORD.iter_unpack(data[:usable]):
+                found[key.rstrip(b'\0').decode('ascii')] = (seq, offset, length)
+            read_to[seq] = consumed + usable
+
+        with self._lock:
+            # Only segments we knew about before listing can have disappeared
+            for seq in set(known) - present:
+                self._forget_segment(seq)
+            self._index.update(found)
+            for seq, position in read_to.items():
+                self._index_read[seq] = max(self._index_read.get(seq, 0), position)
+
+    def _forget_segment(self, seq: int):
+        # Caller holds self._lock
+        self._index_read.pop(seq, None)
+        self._maps.pop(seq, None)
+        for blob_id in [b for b, location in self._index.items() if location[0] == seq]:
+            del self._index[blob_id]
+
+    def _encode_id(self, blob_id: str) -> bytes:
+        key = blob_id.encode('ascii')
+        if len(key) > 16:
+            raise ValueError(f"Blob id too long for packed storage: {blob_id}")
+        return key
+
+    def _pack_path(self, seq: int) -> str:
+        return os.path.join(self.root_dir, f"{seq:08d}.pack")
+
+    def _index_path(self, seq: int) -> str:
+        return os.path.join(self.root_dir, f"{seq:08d}.idx")
@@ -1,6 +1,11 @@
 import logging
-from typing import List, Dict
+from typing import List, Iterator
 import re
+from app.services.segment import Segment, Emotion, VoiceStyle
+
+_SENTENCE_SPLIT = re.compile(r'[.!?]+')
+_CUE_PATTERN = re.compile(r'\((.*?)\)')
+_CUE_STRIP = re.compile(r'\([^)]*\)')
 
 class EmotionAnalyzer:
     def __init__(self):
@@ -9,61 +14,53 @@ class EmotionAnalyzer:
         
         # Mapping emotions to Murf AI voice styles
         self.emotion_to_murf_style = {
-            'joy': 'excited',
-            'happiness': 'excited',
-            'excitement': 'excited',
-            'sadness': 'sad',
-            'sad': 'sad',
-            'anger': 'angry',
-            'angry': 'angry',
-            'fear': 'terrified',
-            'scared': 'terrified',
-            'surprise': 'excited',
-            'neutral': 'conversational',
-            'calm': 'calm',
-            'peaceful': 'calm',
-            'mysterious': 'conversational',
-            'dramatic': 'conversational'
+            Emotion.JOY: VoiceStyle.EXCITED,
+            Emotion.HAPPINESS: VoiceStyle.EXCITED,
+            Emotion.EXCITEMENT: VoiceStyle.EXCITED,
+            Emotion.SADNESS: VoiceStyle.SAD,
+            Emotion.ANGER: VoiceStyle.ANGRY,
+            Emotion.FEAR: VoiceStyle.TERRIFIED,
+            Emotion.SURPRISE: VoiceStyle.EXCITED,
+            Emotion.NEUTRAL: VoiceStyle.CONVERSATIONAL,
+            Emotion.CALM: VoiceStyle.CALM,
+            Emotion.MYSTERIOUS: VoiceStyle.CONVERSATIONAL
         }
     
-    def analyze_story_emotions(self, story_text: str, preferred_moods: List[str]) -> List[Dict]:
+    def analyze_story_emotions(self, story_text: str, preferred_moods: List[str]) -> List[Segment]:
         """Analyze emotions in story text using rule-based approach"""
-        # Split story into sentences
-        sentences = re.split(r'[.!?]+', story_text)
-        emotional_segments = []
+        return list(self.iter_story_emotions(story_text, preferred_moods))
+    
+    def iter_story_emotions(self, story_text: str, preferred_moods: List[str]) -> Iterator[Segment]:
+        """Yield emotional segments one sentence at a time"""
+        # Parse moods once instead of per sentence
+        moods = [Emotion.parse(mood) for mood in preferred_moods] if preferred_moods else [Emotion.NEUTRAL]
         
         # Use preferred moods in rotation for simplicity
         mood_index = 0
         
-        for sentence in sentences:
+        for sentence in _SENTENCE_SPLIT.split(story_text):
             sentence = sentence.strip()
             if len(sentence) < 10:  # Skip very short sentences
                 continue
                 
             # Extract emotional cues from parentheses
-            emotional_cues = re.findall(r'\((.*?)\)', sentence)
-            clean_sentence = re.sub(r'\([^)]*\)', '', sentence).strip()
+            emotional_cue = _CUE_PATTERN.search(sentence)
             
-            if emotional_cues:
+            if emotional_cue:
                 # Use explicit emotional cue
-                emotion = emotional_cues[0].lower()
+                clean_sentence = _CUE_STRIP.sub('', sentence).strip()
+                emotion = Emotion.parse(emotional_cue.group(1))
                 confidence = 0.9
             else:
                 # Use preferred moods in rotation
-                if preferred_moods:
-                    emotion = preferred_moods[mood_index % len(preferred_moods)]
-                    mood_index += 1
-                else:
-                    emotion = 'neutral'
+                clean_sentence = sentence
+                emotion = moods[mood_index % len(moods)]
+                mood_index += 1
                 confidence = 0.7
             
-            murf_style = self.emotion_to_murf_style.get(emotion, 'conversational')
-            
-            emotional_segments.append({
-                'text': clean_sentence,
-                'emotion': emotion,
-                'murf_style': murf_style,
-                'confidence': confidence
-            })
-        
-        return emotional_segments
+            yield Segment(
+                text=clean_sentence,
+                emotion=emotion,
+                style=self.emotion_to_murf_style.get(emotion, VoiceStyle.CONVERSATIONAL),
+                confidence=confidence
+            )
@@ -0,0 +1,167 @@
+import hashlib
+import itertools
+import threading
+import time
+import os
+import logging
+from collections import Counter
+from typing import List, Dict, Optional
+from app.services.shared_state import SharedState
+
+
+def load_murf_keys() -> List[str]:
+    """Murf API keys from MURF_API_KEYS (comma-separated), falling back to MURF_API_KEY"""
+    keys = [key.strip() for key in os.environ.get('MURF_API_KEYS', '').split(',') if key.strip()]
+    if not keys and os.environ.get('MURF_API_KEY'):
+        keys = [os.environ['MURF_API_KEY'].strip()]
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(keys))
+
+
+def key_label(api_key: str) -> str:
+    """Stable, non-secret name for a key in logs and metrics"""
+    return hashlib.sha1(api_key.encode('utf-8')).hexdigest()[:8]
+
+
+class MurfKeyPool:
+    """Round-robin pool of Murf API keys.
+
+    Keys that were throttled (429) cool down for the Retry-After period, and
+    rejected keys (401/402/403) are set aside for an hour. With a monthly
+    character quota, the key with the most quota left is preferred. Cooldowns
+    and usage live in the shared state when there is one, so every worker
+    process sees what the others ran into.
+    """
+
+    def __init__(self, keys: List[str] = None, shared_state: SharedState = None):
+        self.keys = keys if keys is not None else load_murf_keys()
+        if not self.keys:
+            raise ValueError("MURF_API_KEYS or MURF_API_KEY environment variable not set")
+
+        self.labels = {key: key_label(key) for key in self.keys}
+        self.shared_state = shared_state
+
+        # Characters each key may synthesize per calendar month; 0 means no limit
+        self.monthly_characters = int(os.environ.get('MURF_KEY_MONTHLY_CHARACTERS', 0))
+        self.default_cooldown = float(os.environ.get('MURF_KEY_COOLDOWN_SECONDS', 60))
+        self.rejected_cooldown = 3600
+
+        self._rotation = itertools.count()
+        self._lock = threading.Lock()
+        # Used when there is no shared state
+        self._cooldowns: Dict[str, float] = {}
+        self._counters = Counter()
+
+        logging.info("Murf key pool initialized with %d key(s)", len(self.keys))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, characters: int = 0) -> str:
+        """Pick the key for the next call, skipping keys that are cooling down or out of quota"""
+        start = next(self._rotation) % len(self.keys)
+        rotated = self.keys[start:] + self.keys[:start]
+
+        now = time.time()
+        candidates = [key for key in rotated if self._cooldown_until(key) <= now]
+        if not candidates:
+            raise Exception("All Murf API keys are throttled; try again shortly")
+
+        if not self.monthly_characters:
+            return candidates[0]
+
+        month = self._month()
+        remaining = {key: self.monthly_characters - self._counter(f"{self.labels[key]}:characters:{month}")
+                     for key in candidates}
+        # max() keeps the first of equals, so ties still rotate
+        best = max(candidates, key=remaining.get)
+        if remaining[best] < characters:
+            raise Exception("Murf character quota exhausted on every API key")
+        return best
+
+    def record(self, api_key: str, characters: int = 0):
+        """Count a completed call and the characters it was billed for"""
+        label = self.labels[api_key]
+        self._incr(f"{label}:requests")
+        if characters:
+            self._incr(f"{label}:characters", characters)
+            self._incr(f"{label}:characters:{self._month()}", characters)
+
+    def throttle(self, api_key: str, retry_after: Optional[str] = None):
+        """Cool a key down after a 429, for Retry-After seconds when Murf sends it"""
+        try:
+            seconds = float(retry_after) if retry_after else self.default_cooldown
+        except ValueError:
+            seconds = self.default_cooldown
+        label = self.labels[api_key]
+        self._incr(f"{label}:throttled")
+        self._set_cooldown(api_key, seconds)
+        logging.warning("Murf key %s throttled, cooling down for %.0fs", label, seconds)
+
+    def reject(self, api_key: str, status_code: int):
+        """Set aside a key Murf refused (invalid, unpaid or out of quota)"""
+        label = self.labels[api_key]
+        self._incr(f"{label}:rejected")
+        self._set_cooldown(api_key, self.rejected_cooldown)
+        logging.error("Murf key %s rejected with %s, disabled for %ss", label, status_code, self.rejected_cooldown)
+
+    def usage(self) -> Dict[str, Dict]:
+        """Per-key usage for metrics, keyed by label"""
+        now = time.time()
+        month = self._month()
+        report = {}
+        for key in self.keys:
+            label = self.labels[key]
+            entry = {
+                'requests': self._counter(f"{label}:requests"),
+                'characters': self._counter(f"{label}:characters"),
+                'characters_this_month': self._counter(f"{label}:characters:{month}"),
+                'throttled': self._counter(f"{label}:throttled"),
+                'rejected': self._counter(f"{label}:rejected"),
+                'cooldown_seconds': round(max(self._cooldown_until(key) - now, 0), 1)
+            }
+            if self.monthly_characters:
+                entry['remaining_characters'] = self.monthly_characters - entry['characters_this_month']
+            report[label] = entry
+        return report
+
+    def _month(self) -> str:
+        return time.strftime('%Y-%m', time.gmtime())
+
+    def _cooldown_until(self, api_key: str) -> float:
+        if self.shared_state:
+            try:
+                return self.shared_state.get(f"murf_key_cooldown:{self.labels[api_key]}", 0)
+            except Exception as e:
+                logging.warning("Could not read Murf key cooldown: %s", e)
+        with self._lock:
+            return self._cooldowns.get(api_key, 0)
+
+    def _set_cooldown(self, api_key: str, seconds: float):
+        until = time.time() + seconds
+        with self._lock:
+            self._cooldowns[api_key] = until
+        if self.shared_state:
+            try:
+                self.shared_state.set(f"murf_key_cooldown:{self.labels[api_key]}", until, ttl=seconds)
+            except Exception as e:
+                logging.warning("Could not share Murf key cooldown: %s", e)
+
+    def _incr(self, name: str, amount: float = 1):
+        if self.shared_state:
+            try:
+                self.shared_state.incr(f"murf_key:{name}", amount)
+                return
+            except Exception as e:
+                logging.warning("Could not update Murf key counters: %s", e)
+        with self._lock:
+            self._counters[name] += amount
+
+    def _counter(self, name: str) -> float:
+        if self.shared_state:
+            try:
+                return self.shared_state.counter(f"murf_key:{name}")
+            except Exception as e:
+                logging.warning("Could not read Murf key counters: %s", e)
+        with self._lock:
+            return self._counters[name]
@@ -0,0 +1,124 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Tuple
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    """How much of the pipeline a request gets"""
+    level: int
+    name: str
+    word_scale: float       # fraction of the story generator's word target
+    segmented_audio: bool   # per-segment synthesis, or one Murf call for the whole story
+    enhance_story: bool     # run the audio-narration enhancements on the story text
+    audio: bool             # narrate at all
+
+
+QUALITY_TIERS = (
+    QualityTier(0, 'full', 1.0, True, True, True),
+    QualityTier(1, 'shorter', 0.7, True, True, True),
+    QualityTier(2, 'single_voice_call', 0.5, False, True, True),
+    QualityTier(3, 'plain', 0.5, False, False, True),
+    QualityTier(4, 'story_only', 0.5, False, False, False),
+)
+
+# Pressure above each threshold steps one tier down
+_PRESSURE_STEPS = (0.7, 0.85, 1.0, 1.25)
+
+
+class QualityPolicy:
+    """Pick a quality tier for each story request from the current load.
+
+    Pressure is the larger of queue depth (stories in flight in this process
+    against QUALITY_MAX_INFLIGHT) and recent latency. Latency is measured per
+    minute of story asked of the generator, so a long story isn't mistaken
+    for overload: the p90 of the last minute is compared against
+    QUALITY_LATENCY_BUDGET_SECONDS_PER_MINUTE, and only once there are enough
+    samples to trust it. Higher pressure drops tiers at once. Recovery goes one
+    tier per QUALITY_RECOVERY_SECONDS of low pressure, so the policy doesn't flap.
+    """
+
+    def __init__(self, max_inflight: int = None, latency_budget: float = None,
+                 recovery_seconds: float = None, window_seconds: float = 60, min_samples: int = 10):
+        self.max_inflight = max_inflight or int(os.environ.get('QUALITY_MAX_INFLIGHT', 32))
+        # Seconds per minute of story
+        self.latency_budget = latency_budget or \
+            float(os.environ.get('QUALITY_LATENCY_BUDGET_SECONDS_PER_MINUTE', 15))
+        self.recovery_seconds = recovery_seconds if recovery_seconds is not None else \
+            float(os.environ.get('QUALITY_RECOVERY_SECONDS', 15))
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._latencies = deque(maxlen=500)
+        self._level = 0
+        self._changed_at = time.monotonic()
+
+    @contextmanager
+    def admit(self, minutes: float = 1) -> Iterator[QualityTier]:
+        """Count a story request in flight and yield the tier it should be served at"""
+        with self._lock:
+            self._inflight += 1
+            tier = self._choose_tier()
+        # Shorter tiers ask for fewer words, so they cost less per requested minute
+        story_minutes = max(minutes * tier.word_scale, 0.1)
+        start = time.perf_counter()
+        try:
+            yield tier
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._inflight -= 1
+                self._latencies.append((time.monotonic(), elapsed / story_minutes))
+
+    def status(self) -> Dict:
+        """Current tier and the signals behind it, for metrics"""
+        with self._lock:
+            level, _ = self._settle(time.monotonic())
+            return {
+                'tier': QUALITY_TIERS[level].name,
+                'level': level,
+                'inflight': self._inflight,
+                'p90_seconds_per_minute': round(self._recent_p90(), 3),
+                'pressure': round(self._pressure(), 3)
+            }
+
+    def _recent_p90(self) -> float:
+        """p90 seconds per story minute, or 0 until the window holds enough samples"""
+        cutoff = time.monotonic() - self.window_seconds
+        recent = sorted(latency for finished, latency in self._latencies if finished >= cutoff)
+        if len(recent) < self.min_samples:
+            return 0.0
+        return recent[int(len(recent) * 0.9)]
+
+    def _pressure(self) -> float:
+        return max(self._inflight / self.max_inflight, self._recent_p90() / self.latency_budget)
+
+    def _settle(self, now: float) -> Tuple[int, float]:
+        """The level and recovery clock for now, without changing either"""
+        target = sum(1 for step in _PRESSURE_STEPS if self._pressure() > step)
+        if target >= self._level:
+            # Rising, or pressure still matches this tier; recovery starts from here
+            return target, now
+        steps = int((now - self._changed_at) // self.recovery_seconds) if self.recovery_seconds > 0 \
+            else self._level - target
+        level = max(self._level - steps, target)
+        if level == target:
+            return level, now
+        # Keep the time already served towards the next step
+        return level, self._changed_at + steps * self.recovery_seconds
+
+    def _choose_tier(self) -> QualityTier:
+        level, changed_at = self._settle(time.monotonic())
+        if level > self._level:
+            logging.warning("Load rising, serving stories at tier %s", QUALITY_TIERS[level].name)
+        elif level < self._level:
+            logging.info("Load easing, serving stories at tier %s", QUALITY_TIERS[level].name)
+        self._level, self._changed_at = level, changed_at
+        return QUALITY_TIERS[self._level]
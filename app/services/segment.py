@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+
+class Emotion(str, Enum):
+    """Emotions the narration pipeline knows how to voice"""
+    EXCITEMENT = 'excitement'
+    JOY = 'joy'
+    HAPPINESS = 'happiness'
+    SADNESS = 'sadness'
+    ANGER = 'anger'
+    FEAR = 'fear'
+    SURPRISE = 'surprise'
+    CALM = 'calm'
+    MYSTERIOUS = 'mysterious'
+    NEUTRAL = 'neutral'
+
+    @classmethod
+    def parse(cls, value) -> 'Emotion':
+        """Map a mood or an emotional cue like '(sad)' to an Emotion, defaulting to neutral"""
+        if isinstance(value, cls):
+            return value
+        key = str(value).strip().lower()
+        return _EMOTION_LOOKUP.get(key, cls.NEUTRAL)
+
+
+# Aliases for cues the story model writes instead of canonical emotion names
+_EMOTION_LOOKUP = {emotion.value: emotion for emotion in Emotion}
+_EMOTION_LOOKUP.update({
+    'sad': Emotion.SADNESS,
+    'angry': Emotion.ANGER,
+    'scared': Emotion.FEAR,
+    'peaceful': Emotion.CALM
+})
+
+
+class VoiceStyle(str, Enum):
+    """Murf AI voice styles"""
+    EXCITED = 'excited'
+    CHEERFUL = 'cheerful'
+    SAD = 'sad'
+    ANGRY = 'angry'
+    TERRIFIED = 'terrified'
+    CALM = 'calm'
+    CONVERSATIONAL = 'conversational'
+
+
+@dataclass(slots=True)
+class Segment:
+    """One narrated sentence and the delivery parameters chosen for it.
+
+    Segments are created once by the emotion analyzer and annotated in place
+    by later stages rather than copied into new dicts.
+    """
+    text: str
+    emotion: Emotion = Emotion.NEUTRAL
+    style: VoiceStyle = VoiceStyle.CONVERSATIONAL
+    confidence: float = 0.7
+    speed: float = 1.0
+    pitch: float = 1.0
+    emphasis: str = 'none'
+    pause_after: float = 0.5
+    audio_key: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        """Plain JSON-friendly representation for storage and API responses"""
+        return {
+            'text': self.text,
+            'emotion': self.emotion.value,
+            'murf_style': self.style.value,
+            'confidence': self.confidence,
+            'speed': self.speed,
+            'pitch': self.pitch,
+            'emphasis': self.emphasis,
+            'pause_after': self.pause_after,
+            'audio_key': self.audio_key
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Segment':
+        """Rebuild a segment from its stored representation"""
+        return cls(
+            text=data['text'],
+            emotion=Emotion.parse(data.get('emotion', 'neutral')),
+            style=VoiceStyle(data.get('murf_style', 'conversational')),
+            confidence=data.get('confidence', 0.7),
+            speed=data.get('speed', 1.0),
+            pitch=data.get('pitch', 1.0),
+            emphasis=data.get('emphasis', 'none'),
+            pause_after=data.get('pause_after', 0.5),
+            audio_key=data.get('audio_key')
+        )
+
+
+def reuse_unchanged_segments(previous: List[Segment], revised: List[Segment]) -> Tuple[List[Segment], int]:
+    """Merge a revised segment list with the previous narration.
+
+    Segments whose text is unchanged keep their previous delivery and audio so
+    that an edit early in the story doesn't shift the mood rotation for every
+    sentence after it. Returns the merged list and the number of segments that
+    were added or changed.
+    """
+    matcher = SequenceMatcher(None, [s.text for s in previous], [s.text for s in revised], autojunk=False)
+    merged = []
+    changed = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            merged.extend(previous[i1:i2])
+        else:
+            merged.extend(revised[j1:j2])
+            changed += j2 - j1
+    return merged, changed
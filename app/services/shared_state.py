@@ -0,0 +1,107 @@
+import sqlite3
+import threading
+import json
+import time
+import os
+import logging
+from typing import Any, Callable, Dict
+
+
+class SharedState:
+    """Small SQLite-backed cache and counter store shared by every worker process.
+
+    Each process (and thread) opens its own connection, so the same instance
+    keeps working in gunicorn workers forked from a preloaded master.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.environ.get('SHARED_STATE_PATH', 'instance/shared_state.db')
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(self._SCHEMA)
+        conn.commit()
+
+        logging.info(f"Shared state initialized at {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return a connection owned by this thread in this process"""
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            # A connection inherited across fork must not be reused
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read a cached value, ignoring expired entries"""
+        row = self._connect().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any, ttl: float = None):
+        """Cache a JSON-serializable value, optionally expiring after ttl seconds"""
+        expires_at = time.time() + ttl if ttl else None
+        self._connect().execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), expires_at)
+        )
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: float = None) -> Any:
+        """Return a cached value, computing and caching it when missing.
+
+        Empty results (None, [], {}) are returned but not cached, so a failed
+        upstream call is retried next time.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        value = loader()
+        if value:
+            self.set(key, value, ttl=ttl)
+        return value
+
+    def delete(self, key: str):
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def incr(self, name: str, amount: float = 1):
+        """Atomically add to a counter shared across workers"""
+        self._connect().execute(
+            'INSERT INTO counters (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    def counter(self, name: str) -> float:
+        row = self._connect().execute('SELECT value FROM counters WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def counters(self, prefix: str = '') -> Dict[str, float]:
+        """All counters, optionally only those whose name starts with prefix"""
+        rows = self._connect().execute(
+            "SELECT name, value FROM counters WHERE name LIKE ? ESCAPE '\\' ORDER BY name",
+            (prefix.replace('%', r'\%').replace('_', r'\_') + '%',)
+        ).fetchall()
+        return {name: value for name, value in rows}
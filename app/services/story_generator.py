@@ -5,12 +5,11 @@ import logging
 
 class StoryGenerator:
     def __init__(self):
-        api_key = os.environ.get('GEMINI_API_KEY')
-        if not api_key:
+        self.api_key = os.environ.get('GEMINI_API_KEY')
+        if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.reset_client()
         
         self.duration_word_counts = {
             1: 150, 3: 450, 5: 750, 10: 1500
@@ -18,10 +17,20 @@ class StoryGenerator:
         
         logging.info("Enhanced Story Generator initialized for emotional storytelling")
     
-    def create_story(self, keywords: List[str], theme: str, target_duration: int, preferred_moods: List[str]) -> str:
-        """Generate an emotionally rich story optimized for audio narration"""
+    def reset_client(self):
+        """(Re)build the Gemini client; gRPC channels must not be shared across a fork"""
+        genai.configure(api_key=self.api_key)
+        self.model = genai.GenerativeModel('gemini-1.5-flash')
+    
+    def create_story(self, keywords: List[str], theme: str, target_duration: int, preferred_moods: List[str],
+                     word_scale: float = 1.0, enhance: bool = True) -> str:
+        """Generate an emotionally rich story optimized for audio narration.
+
+        Under load the caller can ask for a shorter story (word_scale) and
+        skip the narration enhancements.
+        """
         try:
-            word_count = self.duration_word_counts.get(target_duration, 450)
+            word_count = int(self.duration_word_counts.get(target_duration, 450) * word_scale)
             moods_text = ", ".join(preferred_moods)
             keywords_text = ", ".join(keywords)
             
@@ -65,6 +74,8 @@ class StoryGenerator:
             
             if response and response.text:
                 story = response.text.strip()
+                if not enhance:
+                    return story
                 # Enhance the story further for audio
                 return self._enhance_for_audio_narration(story, preferred_moods, theme)
             else:
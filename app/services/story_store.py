@@ -0,0 +1,271 @@
+import sqlite3
+import threading
+import queue
+import hashlib
+import json
+import time
+import os
+import atexit
+import logging
+from typing import List, Dict, Optional
+
+
+def normalize_request(keywords: List[str], theme: str, duration: int, moods: List[str]) -> str:
+    """Build a stable key for a story request so equivalent requests share an index entry"""
+    canonical = {
+        'keywords': sorted({str(k).strip().lower() for k in keywords if str(k).strip()}),
+        'theme': str(theme).strip().lower(),
+        'duration': int(duration),
+        'moods': sorted({str(m).strip().lower() for m in moods})
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class StoryStore:
+    """SQLite-backed store of generated stories.
+
+    Writes are handed to a single background thread so the request that
+    produced a story never waits on disk I/O. Records waiting to be written
+    are kept in memory and served from there until they land in the database.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS stories (
+            id TEXT PRIMARY KEY,
+            request_key TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            keywords TEXT NOT NULL,
+            theme TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            moods TEXT NOT NULL,
+            story TEXT NOT NULL,
+            segments TEXT NOT NULL,
+            voice_id TEXT,
+            audio_path TEXT,
+            audio_url TEXT,
+            timings TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_stories_request ON stories (request_key, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_stories_created ON stories (created_at DESC);
+    """
+
+    _COLUMNS = ('id', 'request_key', 'created_at', 'keywords', 'theme', 'duration', 'moods',
+                'story', 'segments', 'voice_id', 'audio_path', 'audio_url', 'timings')
+
+    _JSON_COLUMNS = ('keywords', 'moods', 'segments', 'timings')
+
+    _SUMMARY_COLUMNS = ('id', 'request_key', 'created_at', 'keywords', 'theme', 'duration',
+                        'moods', 'voice_id', 'audio_url')
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.environ.get('STORY_DB_PATH', 'instance/stories.db')
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._local = threading.local()
+        self._writer = None
+        self._writer_pid = None
+        self._writer_guard = threading.Lock()
+
+        # Create the schema up front so readers never race the writer thread
+        conn = self._connect()
+        conn.executescript(self._SCHEMA)
+        conn.commit()
+
+        self._start_writer()
+        atexit.register(self.close)
+
+        logging.info(f"Story store initialized at {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it in WAL mode on first use"""
+        pid = os.getpid()
+        if getattr(self._local, 'conn', None) is None or self._local.pid != pid:
+            # A connection inherited across fork must not be reused
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def _start_writer(self):
+        """Start the writer thread for the current process.
+
+        Threads don't survive fork, so a worker forked from a preloaded master
+        starts its own writer (with a fresh queue) on first use.
+        """
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='story-store-writer', daemon=True)
+        self._writer.start()
+        self._writer_pid = os.getpid()
+
+    def save(self, record: Dict):
+        """Queue a story record for persistence and return immediately"""
+        if self._writer_pid != os.getpid():
+            with self._writer_guard:
+                if self._writer_pid != os.getpid():
+                    self._start_writer()
+        record = dict(record)
+        record.setdefault('created_at', time.time())
+        with self._pending_lock:
+            self._pending[record['id']] = record
+        self._queue.put(record)
+
+    def get(self, story_id: str) -> Optional[Dict]:
+        """Fetch a full story record by id"""
+        with self._pending_lock:
+            pending = self._pending.get(story_id)
+        if pending is not None:
+            return dict(pending)
+
+        row = self._connect().execute(
+            'SELECT * FROM stories WHERE id = ?', (story_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def find_by_request(self, request_key: str) -> Optional[Dict]:
+        """Fetch the most recent story generated for a normalized request"""
+        with self._pending_lock:
+            pending = [r for r in self._pending.values() if r['request_key'] == request_key]
+        if pending:
+            return dict(max(pending, key=lambda r: r['created_at']))
+
+        row = self._connect().execute(
+            'SELECT * FROM stories WHERE request_key = ? ORDER BY created_at DESC LIMIT 1',
+            (request_key,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list_recent(self, limit: int = 20, offset: int = 0, request_key: str = None) -> List[Dict]:
+        """List story summaries, newest first, including records not yet written"""
+        pending = self._pending_summaries(request_key)
+        # Read far enough to page past any pending records that sort ahead of stored ones
+        fetch_limit, fetch_offset = (limit + offset + len(pending), 0) if pending else (limit, offset)
+
+        columns = ', '.join(self._SUMMARY_COLUMNS)
+        if request_key:
+            rows = self._connect().execute(
+                f'SELECT {columns} FROM stories WHERE request_key = ? '
+                'ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                (request_key, fetch_limit, fetch_offset)
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                f'SELECT {columns} FROM stories ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                (fetch_limit, fetch_offset)
+            ).fetchall()
+        stored = [self._row_to_dict(row) for row in rows]
+        if not pending:
+            return stored
+
+        # A record can be committed a moment before it leaves the pending map
+        merged = {record['id']: record for record in stored}
+        merged.update((record['id'], record) for record in pending)
+        ordered = sorted(merged.values(), key=lambda r: r['created_at'], reverse=True)
+        return ordered[offset:offset + limit]
+
+    def count(self, request_key: str = None) -> int:
+        """Count stories, optionally for a single normalized request, including records not yet written"""
+        conn = self._connect()
+        if request_key:
+            row = conn.execute(
+                'SELECT COUNT(*) FROM stories WHERE request_key = ?', (request_key,)
+            ).fetchone()
+        else:
+            row = conn.execute('SELECT COUNT(*) FROM stories').fetchone()
+
+        pending_ids = [record['id'] for record in self._pending_summaries(request_key)]
+        if not pending_ids:
+            return row[0]
+        placeholders = ', '.join('?' for _ in pending_ids)
+        written = conn.execute(
+            f'SELECT COUNT(*) FROM stories WHERE id IN ({placeholders})', pending_ids
+        ).fetchone()[0]
+        return row[0] + len(pending_ids) - written
+
+    def _pending_summaries(self, request_key: str = None) -> List[Dict]:
+        """Summaries of queued records, optionally for a single normalized request"""
+        with self._pending_lock:
+            pending = [r for r in self._pending.values() if not request_key or r['request_key'] == request_key]
+        return [{column: record.get(column) for column in self._SUMMARY_COLUMNS} for record in pending]
+
+    def flush(self, timeout: float = None):
+        """Block until every queued record has been written"""
+        if timeout is None:
+            self._queue.join()
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        """Drain pending writes and stop the writer thread"""
+        if self._writer_pid == os.getpid() and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+    def _write_loop(self):
+        conn = self._connect()
+        placeholders = ', '.join('?' for _ in self._COLUMNS)
+        sql = f"INSERT OR REPLACE INTO stories ({', '.join(self._COLUMNS)}) VALUES ({placeholders})"
+
+        while True:
+            record = self._queue.get()
+            if record is None:
+                self._queue.task_done()
+                break
+
+            # Batch whatever else is already queued into the same transaction
+            batch = [record]
+            stop = False
+            while True:
+                try:
+                    extra = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    stop = True
+                    break
+                batch.append(extra)
+
+            try:
+                with conn:
+                    conn.executemany(sql, [self._record_to_row(r) for r in batch])
+            except Exception as e:
+                logging.error(f"Error persisting {len(batch)} stories: {e}")
+            finally:
+                with self._pending_lock:
+                    for r in batch:
+                        if self._pending.get(r['id']) is r:
+                            del self._pending[r['id']]
+                for _ in batch:
+                    self._queue.task_done()
+
+            if stop:
+                self._queue.task_done()
+                break
+
+        conn.close()
+        self._local.conn = None
+
+    def _record_to_row(self, record: Dict) -> tuple:
+        row = []
+        for column in self._COLUMNS:
+            value = record.get(column)
+            if column in self._JSON_COLUMNS:
+                value = json.dumps(value if value is not None else ({} if column == 'timings' else []))
+            row.append(value)
+        return tuple(row)
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        for column in self._JSON_COLUMNS:
+            if column in record and record[column] is not None:
+                record[column] = json.loads(record[column])
+        return record
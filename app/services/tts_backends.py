@@ -0,0 +1,302 @@
+import os
+import time
+import zlib
+import threading
+import contextvars
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from typing import List, Dict, Optional
+import numpy as np
+import requests
+from app.services.segment import VoiceStyle
+from app.services.audio_assembler import AudioAssembler
+from app.services.murf_keys import MurfKeyPool
+from app.services.shared_state import SharedState
+from app.utils.tracing import span
+
+
+class TTSBackend(ABC):
+    """Text-to-speech provider behind AudioProcessor._call_murf_api"""
+
+    name = 'tts'
+
+    @abstractmethod
+    def synthesize(self, text: str, voice_id: str, style: Optional[VoiceStyle] = None,
+                   rate: float = 1.0, pitch: float = 1.0) -> bytes:
+        """Render text to MP3 bytes"""
+
+    @abstractmethod
+    def list_voices(self) -> List[Dict]:
+        """Voices this backend can render"""
+
+
+class MurfBackend(TTSBackend):
+    """Murf's REST API, taking an API key from the pool for every request"""
+
+    name = 'murf'
+
+    def __init__(self, key_pool: MurfKeyPool, sample_rate: int = 24000, base_url: str = "https://api.murf.ai/v1"):
+        self.key_pool = key_pool
+        self.sample_rate = sample_rate
+        self.base_url = base_url
+
+    def synthesize(self, text: str, voice_id: str, style: Optional[VoiceStyle] = None,
+                   rate: float = 1.0, pitch: float = 1.0) -> bytes:
+        payload = {
+            "text": text,
+            "voiceId": voice_id,
+            "format": "MP3",
+            "sampleRate": self.sample_rate
+        }
+
+        if style and style != VoiceStyle.CONVERSATIONAL:
+            payload["style"] = style.value if isinstance(style, VoiceStyle) else style
+
+        if rate != 1.0:
+            payload["rate"] = rate
+
+        if pitch != 1.0:
+            payload["pitch"] = pitch
+
+        try:
+            with span('murf'):
+                response = self._request('POST', '/speech/generate', characters=len(text), json=payload, timeout=120)
+
+            if response.status_code == 200:
+                result = response.json()
+
+                audio_url = None
+                if isinstance(result, dict):
+                    audio_url = (result.get('audioFile') or
+                               result.get('audio_url') or
+                               result.get('url') or
+                               result.get('downloadUrl'))
+
+                if audio_url:
+                    with span('download'):
+                        audio_response = requests.get(audio_url, timeout=60)
+                    if audio_response.status_code == 200:
+                        logging.info("CLEAN audio generated successfully")
+                        return audio_response.content
+                    else:
+                        raise Exception(f"Failed to download audio: {audio_response.status_code}")
+                else:
+                    if hasattr(response, 'content') and len(response.content) > 1000:
+                        return response.content
+                    else:
+                        raise Exception("No audio data in response")
+            else:
+                error_msg = f"Murf API error: {response.status_code} - {response.text}"
+                logging.error(error_msg)
+                raise Exception(error_msg)
+
+        except requests.exceptions.Timeout:
+            raise Exception("Murf API request timed out")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Network error: {str(e)}")
+
+    def list_voices(self) -> List[Dict]:
+        response = self._request('GET', '/speech/voices', timeout=10)
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to get voices: {response.status_code} - {response.text}")
+
+        voices_data = response.json()
+
+        # Handle different response formats
+        if isinstance(voices_data, list):
+            voices = voices_data
+        elif isinstance(voices_data, dict):
+            voices = voices_data.get('voices', voices_data.get('data', []))
+        else:
+            logging.warning("Unexpected voices response format: %s", type(voices_data))
+            return []
+
+        return voices if isinstance(voices, list) else []
+
+    def _request(self, method: str, path: str, characters: int = 0, **kwargs) -> requests.Response:
+        """Send a request with a key from the pool, moving on to the next key when Murf refuses one"""
+        url = f"{self.base_url}{path}"
+        response = None
+
+        for _ in range(len(self.key_pool)):
+            api_key = self.key_pool.acquire(characters)
+            headers = {
+                "api-key": api_key,
+                "Content-Type": "application/json"
+            }
+            response = requests.request(method, url, headers=headers, **kwargs)
+
+            if response.status_code == 429:
+                self.key_pool.throttle(api_key, response.headers.get('Retry-After'))
+                continue
+            if response.status_code in (401, 402, 403):
+                self.key_pool.reject(api_key, response.status_code)
+                continue
+
+            self.key_pool.record(api_key, characters if response.status_code == 200 else 0)
+            return response
+
+        # Every key was refused; let the caller report the last answer
+        return response
+
+
+class LocalBackend(TTSBackend):
+    """Offline stand-in for Murf that renders the same input to the same audio.
+
+    Each word becomes a short tone whose frequency comes from a hash of the
+    word and voice, scaled by pitch and timed by rate. It sounds nothing like
+    speech, but clip lengths follow the text, so the full pipeline runs
+    without network access or quota. Clips are saved, stitched and served as
+    MP3, so encoding goes through the assembler and needs pydub and ffmpeg.
+    """
+
+    name = 'local'
+
+    VOICES = ('en-US-cooper', 'en-US-hazel', 'en-US-natalie', 'en-US-davis', 'en-US-ruby')
+
+    def __init__(self, assembler: AudioAssembler, sample_rate: int = 24000, latency: float = None):
+        self.assembler = assembler
+        self.sample_rate = sample_rate
+        # Optional simulated per-call latency in seconds
+        self.latency = latency if latency is not None else float(os.environ.get('LOCAL_TTS_LATENCY_MS', 0)) / 1000
+
+    def synthesize(self, text: str, voice_id: str, style: Optional[VoiceStyle] = None,
+                   rate: float = 1.0, pitch: float = 1.0) -> bytes:
+        with span('tts'):
+            if self.latency:
+                time.sleep(self.latency)
+            pcm = self.render(text, voice_id, rate, pitch)
+            try:
+                return self.assembler.encode(pcm, format='mp3')
+            except Exception as e:
+                raise Exception(f"Local TTS could not encode MP3 (needs pydub and ffmpeg): {e}")
+
+    def list_voices(self) -> List[Dict]:
+        return [{'voiceId': voice, 'name': voice, 'locale': 'en-US'} for voice in self.VOICES]
+
+    def render(self, text: str, voice_id: str, rate: float = 1.0, pitch: float = 1.0) -> np.ndarray:
+        """Render text to int16 PCM"""
+        rate = rate or 1.0
+        pieces = []
+        for word in text.split():
+            seed = zlib.crc32(f"{voice_id}|{word.lower()}".encode('utf-8'))
+            frequency = (140 + seed % 160) * (pitch or 1.0)
+            duration = (0.12 + 0.05 * len(word)) / rate
+            t = np.arange(int(self.sample_rate * duration), dtype=np.float32) / self.sample_rate
+            tone = np.sin(2 * np.pi * frequency * t) * np.hanning(len(t)).astype(np.float32)
+            pieces.append(tone)
+            pieces.append(np.zeros(int(self.sample_rate * 0.06 / rate), dtype=np.float32))
+        if not pieces:
+            return np.zeros(0, dtype=np.int16)
+        return (np.concatenate(pieces) * 0.3 * 32767).astype(np.int16)
+
+
+class HedgedBackend(TTSBackend):
+    """Send a second, identical request when the first is slower than usual.
+
+    The hedge fires once a call has run longer than the given percentile of
+    recent call times (normalized per character, so long segments aren't
+    hedged just for being long), and whichever answer arrives first wins.
+    Hedges are capped at max_ratio of calls, which bounds extra quota use.
+    Requests can't be cancelled, so the losing call still completes in the
+    background.
+    """
+
+    def __init__(self, backend: TTSBackend, percentile: float = 95, max_ratio: float = 0.1,
+                 min_samples: int = 20, shared_state: SharedState = None):
+        self.backend = backend
+        self.name = backend.name
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.shared_state = shared_state
+
+        self._lock = threading.Lock()
+        self._seconds_per_char = deque(maxlen=200)
+        self._calls = 0
+        self._hedges = 0
+
+    def list_voices(self) -> List[Dict]:
+        return self.backend.list_voices()
+
+    def synthesize(self, text: str, voice_id: str, style: Optional[VoiceStyle] = None,
+                   rate: float = 1.0, pitch: float = 1.0) -> bytes:
+        args = (text, voice_id, style, rate, pitch)
+        delay = self._hedge_delay(len(text))
+        with self._lock:
+            self._calls += 1
+
+        if delay is None:
+            # Still learning what normal looks like; call inline
+            return self._timed_call(args)
+
+        first = self._start(args)
+
+        done, _ = wait([first], timeout=delay)
+        if done or not self._claim_hedge():
+            return first.result()
+
+        logging.info("Hedging slow TTS call after %.2fs", delay)
+        self._count('tts_hedged')
+        second = self._start(args)
+
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count('tts_hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _start(self, args: tuple) -> Future:
+        """Run one backend call on its own thread so no caller waits on a shared queue"""
+        future = Future()
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                future.set_result(context.run(self._timed_call, args))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name='tts-call', daemon=True).start()
+        return future
+
+    def _timed_call(self, args: tuple) -> bytes:
+        start = time.perf_counter()
+        result = self.backend.synthesize(*args)
+        # Only successful calls say anything about normal latency
+        with self._lock:
+            self._seconds_per_char.append((time.perf_counter() - start) / max(len(args[0]), 50))
+        return result
+
+    def _hedge_delay(self, characters: int) -> Optional[float]:
+        """How long to wait before hedging, or None until there are enough samples"""
+        with self._lock:
+            if len(self._seconds_per_char) < self.min_samples:
+                return None
+            ordered = sorted(self._seconds_per_char)
+        index = min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)
+        return ordered[index] * max(characters, 50)
+
+    def _claim_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges + 1 > self.max_ratio * self._calls:
+                return False
+            self._hedges += 1
+            return True
+
+    def _count(self, name: str):
+        if self.shared_state:
+            try:
+                self.shared_state.incr(name)
+            except Exception as e:
+                logging.warning("Could not update TTS counters: %s", e)
+
@@ -1,33 +1,42 @@
 import os
+import time
 import logging
-from datetime import datetime
+from app.utils.structured_logging import BackgroundQueueHandler, build_queue_handler
 
 def setup_logging():
-    """Setup application logging"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('app.log')
-        ]
-    )
+    """Setup application logging.
 
-def cleanup_old_audio_files(directory: str, max_age_hours: int = 24):
-    """Clean up old audio files to save space"""
+    Records are queued and written by a background thread: human-readable
+    lines to the console and JSON lines to a rotating LOG_FILE.
+    """
+    root = logging.getLogger()
+    if any(isinstance(handler, BackgroundQueueHandler) for handler in root.handlers):
+        return
+    
+    root.addHandler(build_queue_handler())
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+def cleanup_old_audio_files(directory: str, max_age_hours: float = 24) -> int:
+    """Delete files in directory not modified for max_age_hours, returning how many were removed"""
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
     try:
-        current_time = datetime.now()
-        for filename in os.listdir(directory):
-            file_path = os.path.join(directory, filename)
-            if os.path.isfile(file_path):
-                file_time = datetime.fromtimestamp(os.path.getctime(file_path))
-                age_hours = (current_time - file_time).total_seconds() / 3600
-                
-                if age_hours > max_age_hours:
-                    os.remove(file_path)
-                    logging.info(f"Cleaned up old audio file: {filename}")
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    # Removed by another worker's sweep in the meantime
+                    continue
+    except FileNotFoundError:
+        return 0
     except Exception as e:
-        logging.error(f"Error cleaning up audio files: {e}")
+        logging.error("Error cleaning up audio files in %s: %s", directory, e)
+    if removed:
+        logging.info("Cleaned up %d old audio files in %s", removed, directory)
+    return removed
 
 def get_file_size_mb(file_path: str) -> float:
     """Get file size in MB"""
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+import logging
+from collections import Counter
+from functools import wraps
+from typing import Dict, Optional
+from flask import current_app, request, make_response
+from app.utils.tracing import current_trace
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler for a single thread.
+
+    A background thread records the target thread's stack every interval,
+    so time spent blocked on Gemini or Murf shows up just like CPU time.
+    Stacks are kept in collapsed form ("outer;inner count"), which
+    flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id: int = None):
+        target = thread_id or threading.get_ident()
+        self._thread = threading.Thread(target=self._run, args=(target,), name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def _run(self, target: int):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[';'.join(stack)] += 1
+
+
+def _should_profile() -> bool:
+    token = current_app.config.get('PROFILE_ADMIN_TOKEN')
+    if token and request.headers.get('X-Profile') == token:
+        return True
+    rate = current_app.config.get('PROFILE_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def profile_request(view):
+    """Profile a view when asked to by the admin header or the sampling rate.
+
+    Unprofiled requests pay for one config lookup and nothing else. The
+    report id is returned in the X-Profile-Id header.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _should_profile():
+            return view(*args, **kwargs)
+
+        profiler = SamplingProfiler(interval=current_app.config.get('PROFILE_INTERVAL_MS', 5) / 1000)
+        started_at = time.time()
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            rv = view(*args, **kwargs)
+        finally:
+            profiler.stop()
+        duration = time.perf_counter() - start
+        trace = current_trace()
+
+        profile_id = uuid.uuid4().hex[:12]
+        report = {
+            'id': profile_id,
+            'endpoint': request.endpoint,
+            'path': request.path,
+            'started_at': started_at,
+            'duration': round(duration, 3),
+            'sample_interval_ms': profiler.interval * 1000,
+            'samples': sum(profiler.samples.values()),
+            'stage_timings': trace.summary() if trace else {},
+            'collapsed': profiler.collapsed()
+        }
+        try:
+            save_profile(report)
+        except Exception as e:
+            logging.error(f"Error saving profile {profile_id}: {e}")
+            return rv
+
+        response = make_response(rv)
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    return wrapper
+
+
+def _profile_dir() -> str:
+    return current_app.config.get('PROFILE_DIR', 'instance/profiles')
+
+
+def save_profile(report: Dict):
+    """Write a profile report, keeping only the newest PROFILE_MAX_STORED"""
+    directory = _profile_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    path = os.path.join(directory, f"{report['id']}.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f)
+    os.replace(tmp_path, path)
+
+    cap = current_app.config.get('PROFILE_MAX_STORED', 50)
+    reports = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json')]
+    if len(reports) > cap:
+        reports.sort(key=os.path.getmtime)
+        for old in reports[:len(reports) - cap]:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(profile_id: str) -> Optional[Dict]:
+    """Read a stored profile report"""
+    if not profile_id.isalnum():
+        return None
+    path = os.path.join(_profile_dir(), f"{profile_id}.json")
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
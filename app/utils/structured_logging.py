@@ -0,0 +1,155 @@
+import os
+import json
+import queue
+import random
+import threading
+import logging
+import logging.handlers
+import warnings
+from datetime import datetime, timezone
+from typing import Dict, List
+from app.utils.tracing import RequestIdFilter
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any extra= fields carried along"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'thread': record.threadName,
+            'request_id': getattr(record, 'request_id', '-'),
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO and DEBUG records from noisy modules.
+
+    Rates are keyed by module name (the source file without .py), since the
+    services log through the root logger. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.module)
+        return rate is None or random.random() < rate
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "audio_processor=0.1,api=0.5" into {'audio_processor': 0.1, 'api': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        module, _, rate = item.partition('=')
+        try:
+            rates[module.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            # Logging isn't set up yet while this runs
+            warnings.warn(f"Ignoring invalid log sample rate: {item}")
+    return rates
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to a listener thread that formats and writes them.
+
+    The calling thread only runs the filters (which stamp the request id while
+    the request context is still current) and puts the record on a queue.
+    Message interpolation, JSON encoding and file I/O all happen on the
+    listener thread. Threads don't survive fork, so each worker process starts
+    its own listener on first use.
+    """
+
+    def __init__(self, handlers: List[logging.Handler]):
+        super().__init__(queue.SimpleQueue())
+        self.handlers = handlers
+        self._listener = None
+        self._listener_pid = None
+        self._guard = threading.Lock()
+        self._inherited_streams = []
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stdlib version formats the message here; leave that to the listener.
+        # Log arguments must therefore not be mutated after the call.
+        return record
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # The queue is thread-safe on its own, so skip the per-handler lock
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        if self._listener_pid != os.getpid():
+            with self._guard:
+                if self._listener_pid != os.getpid():
+                    self._start_listener()
+        super().emit(record)
+
+    def _start_listener(self):
+        if self._listener_pid is not None:
+            # Forked: the parent's listener may have been mid-write, so open
+            # fresh file streams. The inherited ones are kept, never flushed.
+            for handler in self.handlers:
+                if isinstance(handler, logging.FileHandler) and handler.stream is not None:
+                    self._inherited_streams.append(handler.stream)
+                    handler.stream = None
+        self.queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self._listener.start()
+        self._listener_pid = os.getpid()
+
+    def stop(self):
+        """Write out everything still queued and stop the listener"""
+        if self._listener is not None and self._listener_pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+
+    def close(self):
+        # logging.shutdown() closes every handler at exit, draining the queue
+        self.stop()
+        super().close()
+
+
+def build_queue_handler() -> BackgroundQueueHandler:
+    """Build the root handler from the LOG_* environment settings"""
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'))
+    handlers = [console]
+
+    log_file = os.environ.get('LOG_FILE', 'app.log')
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            backupCount=int(os.environ.get('LOG_BACKUP_COUNT', 5)),
+            encoding='utf-8',
+            delay=True
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    handler = BackgroundQueueHandler(handlers)
+    # Sample first so dropped records cost nothing more
+    rates = parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', ''))
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+    handler.addFilter(RequestIdFilter())
+    return handler
@@ -0,0 +1,124 @@
+import re
+import time
+import threading
+import uuid
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from flask import request, g
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+# Accept caller-supplied request ids only if they are safe to echo into headers and logs
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestTrace:
+    """Per-request stage timings.
+
+    Each stage reports its wall-clock coverage: the union of its spans, so
+    parallel Murf calls that overlap count once. The summed time and call
+    count go in the Server-Timing description.
+    """
+
+    def __init__(self, request_id: str = None):
+        self.request_id = request_id or uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float):
+        # Segment synthesis records spans from several threads at once
+        with self._lock:
+            self.spans.setdefault(name, []).append((start, end))
+
+    def summary(self) -> Dict[str, float]:
+        """Wall-clock milliseconds covered by each stage"""
+        with self._lock:
+            return {name: round(_coverage(intervals) * 1000, 1) for name, intervals in self.spans.items()}
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, ending with the total request time"""
+        parts = []
+        with self._lock:
+            stages = [(name, list(intervals)) for name, intervals in self.spans.items()]
+        for name, intervals in stages:
+            part = f"{name};dur={_coverage(intervals) * 1000:.1f}"
+            if len(intervals) > 1:
+                summed = sum(end - start for start, end in intervals)
+                part += f';desc="sum={summed * 1000:.1f}ms x{len(intervals)}"'
+            parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ', '.join(parts)
+
+
+def _coverage(intervals: List[Tuple[float, float]]) -> float:
+    """Seconds covered by the union of (start, end) intervals"""
+    covered = 0.0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                covered += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        covered += current_end - current_start
+    return covered
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def current_request_id() -> str:
+    trace = _current_trace.get()
+    return trace.request_id if trace else '-'
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as a named stage of the current request; a no-op outside requests"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter())
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp every log record with the id of the request that produced it"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+def init_tracing(app):
+    """Trace every request and report stages in Server-Timing and X-Request-ID"""
+
+    @app.before_request
+    def start_trace():
+        incoming = request.headers.get('X-Request-ID', '')
+        trace = RequestTrace(incoming if _REQUEST_ID.match(incoming) else None)
+        g.trace_token = _current_trace.set(trace)
+
+    @app.after_request
+    def finish_trace(response):
+        trace = _current_trace.get()
+        if trace is not None:
+            response.headers['Server-Timing'] = trace.server_timing()
+            response.headers['X-Request-ID'] = trace.request_id
+        return response
+
+    @app.teardown_request
+    def clear_trace(exc):
+        token = g.pop('trace_token', None)
+        if token is not None:
+            _current_trace.reset(token)
@@ -6,6 +6,14 @@ class Config:
     MURF_API_KEY = os.environ.get('MURF_API_KEY')
     UPLOAD_FOLDER = 'static/audio/generated'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    
+    # Per-request profiling: a fraction of requests, or any request carrying
+    # an X-Profile header that matches the admin token
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_ADMIN_TOKEN = os.environ.get('PROFILE_ADMIN_TOKEN')
+    PROFILE_INTERVAL_MS = 5
+    PROFILE_MAX_STORED = int(os.environ.get('PROFILE_MAX_STORED', 50))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'instance/profiles')
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -19,6 +27,7 @@ class TestingConfig(Config):
     TESTING = True
     WTF_CSRF_ENABLED = False
     UPLOAD_FOLDER = 'tests/temp_audio'
+    PROFILE_DIR = 'tests/temp_profiles'
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,44 @@
+# Production server profile: gunicorn -c gunicorn.conf.py
+#
+# Story generation spends nearly all of its time waiting on Gemini and Murf,
+# so each worker runs many threads instead of one request at a time.
+import multiprocessing
+import os
+
+wsgi_app = "app:create_app('production')"
+bind = f"0.0.0.0:{os.environ.get('PORT', 5004)}"
+
+# Import the app and its dependencies once in the master and share the pages
+# with every worker; per-process clients are rebuilt in post_fork below
+preload_app = True
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+# Every thread may be narrating a story, so let the quality policy see them all
+# in flight before it starts stepping down (read when the app is preloaded)
+os.environ.setdefault('QUALITY_MAX_INFLIGHT', str(threads))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))  # gevent only
+
+# A full story can take well over a minute of upstream calls
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 60
+keepalive = 5
+
+# Recycle workers now and then, staggered so they don't all restart together
+max_requests = 2000
+max_requests_jitter = 200
+
+# Every worker would rotate a shared LOG_FILE on its own and clobber the
+# others' output, so log to the console unless a file is asked for explicitly.
+# This runs before the app is loaded, so setup_logging() sees it.
+os.environ.setdefault('LOG_FILE', '')
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    from app.routes.api import reinitialize_services
+    reinitialize_services()
@@ -2,20 +2,48 @@ class NarrateAI {
     constructor() {
         this.initializeEventListeners();
         this.currentAudioUrl = null;
+        this.currentStoryId = null;
+        this.audioSources = [];
         this.isGenerating = false;
+        this.loadSharedStory();
+    }
+
+    async loadSharedStory() {
+        // Restore a stored story from ?story=<id> so reloads and shared links don't regenerate
+        const storyId = new URLSearchParams(window.location.search).get('story');
+        if (!storyId) return;
+
+        try {
+            const response = await fetch(`/api/stories/${encodeURIComponent(storyId)}`);
+            const data = await response.json();
+
+            if (data.success) {
+                this.displayStory(data);
+            } else {
+                this.showError(data.error || 'Could not load this story.');
+            }
+        } catch (error) {
+            this.showError('Network error. Please check your connection and try again.');
+            console.error('Error:', error);
+        }
     }
 
     initializeEventListeners() {
         const generateBtn = document.getElementById('generateBtn');
         const downloadBtn = document.getElementById('downloadBtn');
         const regenerateBtn = document.getElementById('regenerateBtn');
+        const updateNarrationBtn = document.getElementById('updateNarrationBtn');
         const dismissError = document.getElementById('dismissError');
 
         generateBtn.addEventListener('click', () => this.generateStory());
         downloadBtn.addEventListener('click', () => this.downloadAudio());
         regenerateBtn.addEventListener('click', () => this.regenerateStory());
+        updateNarrationBtn.addEventListener('click', () => this.updateNarration());
         dismissError.addEventListener('click', () => this.hideError());
 
+        // If a format fails to load or decode, move on to the next one
+        document.getElementById('storyAudio').addEventListener('error', () => this.tryNextAudioSource());
+
         // Auto-select at least one mood if none selected
         const moodCheckboxes = document.querySelectorAll('input[name="moods"]');
         moodCheckboxes.forEach(checkbox => {
@@ -103,6 +131,44 @@ class NarrateAI {
         }
     }
 
+    async updateNarration() {
+        // Re-narrate the edited text; the server only synthesizes sentences that changed
+        if (this.isGenerating || !this.currentStoryId) return;
+
+        const storyText = document.getElementById('storyText').innerText.trim();
+        if (!storyText) {
+            this.showError('The story text cannot be empty.');
+            return;
+        }
+
+        this.showLoading();
+        this.isGenerating = true;
+
+        try {
+            const response = await fetch(`/api/stories/${encodeURIComponent(this.currentStoryId)}/edit`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ story: storyText })
+            });
+
+            const data = await response.json();
+
+            if (data.success) {
+                this.displayStory(data);
+            } else {
+                this.showError(data.error || 'An error occurred while updating the narration.');
+            }
+        } catch (error) {
+            this.showError('Network error. Please check your connection and try again.');
+            console.error('Error:', error);
+        } finally {
+            this.hideLoading();
+            this.isGenerating = false;
+        }
+    }
+
     regenerateStory() {
         this.hideOutput();
         this.generateStory();
@@ -155,6 +221,14 @@ class NarrateAI {
     }
 
     displayStory(data) {
+        // Make the current story linkable
+        this.currentStoryId = data.story_id || null;
+        if (data.story_id) {
+            const url = new URL(window.location.href);
+            url.searchParams.set('story', data.story_id);
+            window.history.replaceState(null, '', url);
+        }
+
         // Update story info
         document.getElementById('durationInfo').textContent = `Duration: ${data.duration_estimate}`;
         document.getElementById('emotionsInfo').textContent = `Emotions: ${data.emotions_used.join(', ')}`;
@@ -168,8 +242,9 @@ class NarrateAI {
         const audioSection = document.querySelector('.audio-player');
         
         if (data.audio_url && data.audio_url !== null && data.audio_url !== 'null') {
-            // Audio is available
-            audioPlayer.src = data.audio_url;
+            // Audio is available - stream the smallest format this browser can play
+            this.audioSources = this.listAudioSources(audioPlayer, data);
+            audioPlayer.src = this.audioSources.shift();
             this.currentAudioUrl = data.audio_url;
             audioSection.style.display = 'block';
             
@@ -202,6 +277,26 @@ class NarrateAI {
         });
     }
 
+    listAudioSources(audioPlayer, data) {
+        // audio_formats is ordered smallest first; the original audio_url is the last resort
+        const urls = (data.audio_formats || [])
+            .filter(format => audioPlayer.canPlayType(format.mimetype) !== '')
+            .map(format => format.url);
+        urls.push(data.audio_url);
+        return [...new Set(urls)];
+    }
+
+    tryNextAudioSource() {
+        const next = this.audioSources.shift();
+        if (!next) return;
+        const audioPlayer = document.getElementById('storyAudio');
+        console.log('Audio format failed to load, trying', next);
+        audioPlayer.src = next;
+        audioPlayer.play().catch(error => {
+            console.log('Auto-play prevented by browser:', error);
+        });
+    }
+
     hideOutput() {
         document.getElementById('outputSection').style.display = 'none';
     }
@@ -269,7 +364,7 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     // Add ripple effect to buttons
-    const buttons = document.querySelectorAll('.generate-btn, .download-btn, .regenerate-btn');
+    const buttons = document.querySelectorAll('.generate-btn, .download-btn, .story-action-btn');
     buttons.forEach(button => {
         button.addEventListener('click', function(e) {
             const ripple = document.createElement('span');
@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# The API module builds its services at import time, so point them at
+# throwaway state and the offline TTS backend before the app is imported
+_STATE_DIR = tempfile.mkdtemp(prefix='story-tests-')
+os.environ.setdefault('GEMINI_API_KEY', 'test-key')
+os.environ['TTS_BACKEND'] = 'local'
+os.environ['STORY_DB_PATH'] = os.path.join(_STATE_DIR, 'stories.db')
+os.environ['SHARED_STATE_PATH'] = os.path.join(_STATE_DIR, 'shared_state.db')
+os.environ['LOG_FILE'] = ''
+os.environ.pop('AUDIO_STORAGE', None)
+
+from app import create_app
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_STATE_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing')
+    # A fresh upload folder per test, so segment clips cached by one test aren't reused by the next
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'audio')
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from app.routes import api
+from app.services.quality_policy import QualityPolicy
+
+STORY = ('Once upon a time there was a brave knight. He walked into the dark forest slowly! '
+         'The dragon roared loudly at the sky. Everyone was happy in the end of this tale.')
+
+
+@pytest.fixture
+def tts_calls(monkeypatch):
+    """Replace speech synthesis with placeholder clips and record the text of every call"""
+    calls = []
+    lock = threading.Lock()
+
+    def synthesize(text, voice_id, style, rate=1.0, pitch=1.0):
+        with lock:
+            calls.append(text)
+        # Not decodable, so clips are joined by concatenation and no ffmpeg is needed
+        return b'clip:' + text.encode('utf-8')
+
+    monkeypatch.setattr(api.audio_processor, '_call_murf_api', synthesize)
+    return calls
+
+
+@pytest.fixture(autouse=True)
+def offline_services(monkeypatch):
+    monkeypatch.setattr(api.story_gen, 'create_story', lambda **kwargs: STORY)
+    # Variants would be encoded in the background from the placeholder clips
+    monkeypatch.setattr(api.audio_formatter, 'prepare', lambda jobs, load_source, track=None: True)
+    monkeypatch.setattr(api, 'quality_policy', QualityPolicy(max_inflight=32))
+
+
+def _generate(client):
+    response = client.post('/api/generate-story', json={
+        'keywords': ['knight'], 'theme': 'fantasy', 'duration': 1, 'moods': ['joy']
+    })
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_generate_story_narrates_every_segment(client, tts_calls):
+    story = _generate(client)
+
+    assert story['success'] is True
+    assert story['quality_tier'] == 'full'
+    assert story['audio_url']
+    assert len(tts_calls) == len(client.get(f"/api/stories/{story['story_id']}").get_json()['segments'])
+
+
+def test_edit_renarrates_only_changed_segments(client, tts_calls):
+    story = _generate(client)
+    generated_calls = len(tts_calls)
+
+    response = client.post(f"/api/stories/{story['story_id']}/edit", json={
+        'story': STORY.replace('roared loudly', 'sang softly')
+    })
+    edited = response.get_json()
+
+    assert response.status_code == 200
+    assert edited['edited_from'] == story['story_id']
+    assert edited['story_id'] != story['story_id']
+    assert edited['segments_synthesized'] == 1
+    assert edited['segments_reused'] == generated_calls - 1
+    assert tts_calls[generated_calls:] == ['The dragon sang softly at the sky.']
+    assert edited['audio_url']
+
+
+def test_unchanged_edit_reuses_every_clip(client, tts_calls):
+    story = _generate(client)
+    generated_calls = len(tts_calls)
+
+    edited = client.post(f"/api/stories/{story['story_id']}/edit", json={'story': STORY}).get_json()
+
+    assert edited['segments_synthesized'] == 0
+    assert edited['segments_reused'] == generated_calls
+    assert len(tts_calls) == generated_calls
+
+
+def test_edit_under_load_skips_narration(client, tts_calls, monkeypatch):
+    story = _generate(client)
+    generated_calls = len(tts_calls)
+    busy = QualityPolicy(max_inflight=1)
+    busy._inflight = 5
+    monkeypatch.setattr(api, 'quality_policy', busy)
+
+    edited = client.post(f"/api/stories/{story['story_id']}/edit", json={
+        'story': STORY.replace('roared loudly', 'sang softly')
+    }).get_json()
+
+    assert edited['success'] is True
+    assert edited['quality_tier'] == 'story_only'
+    assert edited['audio_url'] is None
+    assert len(tts_calls) == generated_calls
+
+
+def test_edit_requires_text(client, tts_calls):
+    story = _generate(client)
+
+    response = client.post(f"/api/stories/{story['story_id']}/edit", json={'story': '  '})
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_edit_unknown_story(client):
+    response = client.post('/api/stories/doesnotexist/edit', json={'story': STORY})
+
+    assert response.status_code == 404
+    assert response.get_json()['error'] == 'Story not found'
+
+
+def test_new_stories_are_listed_before_they_are_written(client, tts_calls):
+    story = _generate(client)
+
+    listing = client.get('/api/stories').get_json()
+
+    assert story['story_id'] in [entry['id'] for entry in listing['stories']]
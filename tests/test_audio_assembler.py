@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from app.services.audio_assembler import AudioAssembler
+
+
+@pytest.fixture
+def assembler():
+    # 1 kHz keeps the arithmetic readable: 10 ms fades are 10 samples
+    return AudioAssembler(sample_rate=1000, crossfade_ms=10, cache_mb=1)
+
+
+def _tone(length, amplitude=8000):
+    return np.full(length, amplitude, dtype=np.int16)
+
+
+def test_no_clips_gives_an_empty_track(assembler):
+    track = assembler.assemble([], [])
+
+    assert track.dtype == np.float32
+    assert len(track) == 0
+
+
+def test_pauses_are_silence_between_clips(assembler):
+    track = assembler.assemble([_tone(100), _tone(100)], [0.05, 0.0])
+
+    assert len(track) == 250
+    assert not track[100:150].any()
+    assert track[50] > 0 and track[200] > 0
+
+
+def test_adjacent_clips_crossfade_with_equal_gain(assembler):
+    track = assembler.assemble([_tone(100), _tone(100)], [0.0, 0.0])
+
+    # The clips overlap by one fade, and both are normalized to the same level
+    assert len(track) == 190
+    level = track[50]
+    assert np.allclose(track[90:100], level, atol=1e-3)
+
+
+def test_short_clips_overlap_by_at_most_half(assembler):
+    track = assembler.assemble([_tone(8), _tone(100), _tone(8)], [0.0, 0.0, 0.0])
+
+    # Each overlap is capped at half of the shorter clip (4 samples)
+    assert len(track) == 108
+    # and still sums to a flat level across it
+    assert np.allclose(track[4:104], track[50], atol=1e-3)
+
+
+def test_quiet_clips_are_normalized_up_to_the_gain_limit(assembler):
+    loud = assembler.assemble([_tone(100, 8000)], [0.0])
+    quiet = assembler.assemble([_tone(100, 30)], [0.0])
+
+    assert loud[50] == pytest.approx(assembler.target_rms, rel=1e-3)
+    assert quiet[50] == pytest.approx(30 / 32768 * assembler.max_gain, rel=1e-3)
+
+
+def test_decoded_clips_are_cached_by_path(assembler, monkeypatch):
+    calls = []
+
+    def decode(data, format='mp3'):
+        calls.append(data)
+        return _tone(10)
+
+    monkeypatch.setattr(assembler, 'decode', decode)
+
+    first = assembler.load_clip('a.mp3', b'clip')
+    second = assembler.load_clip('a.mp3', b'clip')
+
+    assert first is second
+    assert calls == [b'clip']
+    assert not first.flags.writeable
+
+
+def test_clip_cache_evicts_least_recently_used(monkeypatch):
+    assembler = AudioAssembler(sample_rate=1000, cache_mb=40 / (1024 * 1024))
+    monkeypatch.setattr(assembler, 'decode', lambda data, format='mp3': _tone(10))
+
+    for path in ('a.mp3', 'b.mp3', 'c.mp3'):
+        assembler.load_clip(path, b'clip')
+
+    assert list(assembler._cache) == ['b.mp3', 'c.mp3']
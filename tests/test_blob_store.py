@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+
+from app.routes import api
+from app.services.blob_store import BlobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(root_dir=str(tmp_path / 'packs'), segment_size=64, max_age_hours=0)
+
+
+def test_put_and_get(store):
+    store.put('story1', b'first narration')
+    store.put('story2', b'second narration')
+
+    assert bytes(store.get('story1')) == b'first narration'
+    assert bytes(store.get('story2')) == b'second narration'
+    assert store.get('missing') is None
+
+
+def test_blobs_survive_reopening(store):
+    store.put('story1', b'narration')
+
+    reopened = BlobStore(root_dir=store.root_dir, segment_size=64, max_age_hours=0)
+
+    assert bytes(reopened.get('story1')) == b'narration'
+
+
+def test_writes_from_another_store_are_found(store):
+    other = BlobStore(root_dir=store.root_dir, segment_size=64, max_age_hours=0)
+    assert store.get('story1') is None
+
+    other.put('story1', b'narration')
+
+    assert bytes(store.get('story1')) == b'narration'
+
+
+def test_full_segments_roll_over(store):
+    for i in range(4):
+        store.put(f'story{i}', bytes([i]) * 40)
+
+    packs = [name for name in os.listdir(store.root_dir) if name.endswith('.pack')]
+    assert len(packs) > 1
+    assert all(bytes(store.get(f'story{i}')) == bytes([i]) * 40 for i in range(4))
+
+
+def test_expire_drops_old_segments_but_keeps_the_active_one(store):
+    for i in range(4):
+        store.put(f'story{i}', bytes([i]) * 40)
+    old = time.time() - 48 * 3600
+    for name in os.listdir(store.root_dir):
+        if name.endswith('.pack'):
+            os.utime(os.path.join(store.root_dir, name), (old, old))
+
+    removed = store.expire(24)
+
+    assert removed >= 1
+    assert store.get('story0') is None
+    assert bytes(store.get('story3')) == bytes([3]) * 40
+
+
+def test_ids_longer_than_the_index_allows_are_rejected(store):
+    with pytest.raises(ValueError):
+        store.put('x' * 17, b'data')
+
+
+@pytest.fixture
+def packed(store, monkeypatch):
+    monkeypatch.setattr(api, 'blob_store', store)
+    store.put('story1', bytes(range(100)))
+    return store
+
+
+def test_serves_whole_blob(client, packed):
+    response = client.get('/api/audio/story1')
+
+    assert response.status_code == 200
+    assert response.data == bytes(range(100))
+    assert response.headers['Accept-Ranges'] == 'bytes'
+
+
+def test_serves_byte_ranges(client, packed):
+    response = client.get('/api/audio/story1', headers={'Range': 'bytes=10-19'})
+
+    assert response.status_code == 206
+    assert response.data == bytes(range(10, 20))
+    assert response.headers['Content-Range'] == 'bytes 10-19/100'
+
+
+def test_unsatisfiable_range(client, packed):
+    response = client.get('/api/audio/story1', headers={'Range': 'bytes=200-300'})
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */100'
+
+
+def test_missing_blob_is_not_found(client, packed):
+    response = client.get('/api/audio/nope')
+
+    assert response.status_code == 404
+    assert response.get_json()['success'] is False
@@ -0,0 +1,109 @@
+from contextlib import ExitStack
+
+import pytest
+
+from app.services import quality_policy as quality_policy_module
+from app.services.quality_policy import QualityPolicy
+
+
+class FakeClock:
+    """Stands in for the time module so tests control load and elapsed time"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.elapsed = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.elapsed
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(quality_policy_module, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def policy(clock):
+    return QualityPolicy(max_inflight=4, latency_budget=10, recovery_seconds=15, min_samples=10)
+
+
+def _admit_concurrently(policy, count):
+    """Tier names seen by count requests arriving while the earlier ones are still running"""
+    with ExitStack() as stack:
+        return [stack.enter_context(policy.admit()).name for _ in range(count)]
+
+
+def test_idle_service_gets_full_quality(policy):
+    with policy.admit() as tier:
+        assert tier.name == 'full'
+        assert tier.audio and tier.segmented_audio
+
+
+def test_steps_down_as_requests_pile_up(policy):
+    tiers = _admit_concurrently(policy, 6)
+
+    assert tiers == ['full', 'full', 'shorter', 'single_voice_call', 'plain', 'story_only']
+    assert policy.status()['inflight'] == 0
+
+
+def test_recovers_one_tier_per_recovery_period(policy, clock):
+    _admit_concurrently(policy, 6)
+
+    seen = []
+    for _ in range(5):
+        with policy.admit() as tier:
+            seen.append(tier.name)
+        clock.now += 15
+
+    assert seen == ['story_only', 'plain', 'single_voice_call', 'shorter', 'full']
+
+
+def test_partial_recovery_time_carries_over(policy, clock):
+    _admit_concurrently(policy, 6)
+
+    clock.now += 10
+    assert policy.status()['tier'] == 'story_only'
+    clock.now += 10
+    assert policy.status()['tier'] == 'plain'
+    clock.now += 10
+    assert policy.status()['tier'] == 'single_voice_call'
+
+
+def test_slow_stories_step_down_once_there_are_enough_samples(policy, clock):
+    for _ in range(9):
+        with policy.admit(minutes=1):
+            clock.elapsed += 20
+    # Nine samples aren't enough to trust
+    assert policy.status()['tier'] == 'full'
+
+    with policy.admit(minutes=1):
+        clock.elapsed += 20
+
+    # 20 s per story minute against a budget of 10
+    status = policy.status()
+    assert status['p90_seconds_per_minute'] == 20
+    assert status['tier'] == 'story_only'
+
+
+def test_latency_is_measured_per_story_minute(policy, clock):
+    for _ in range(10):
+        with policy.admit(minutes=5):
+            clock.elapsed += 20
+
+    # Long stories taking longer isn't load
+    assert policy.status()['tier'] == 'full'
+
+
+def test_old_samples_leave_the_window(policy, clock):
+    for _ in range(10):
+        with policy.admit(minutes=1):
+            clock.elapsed += 20
+
+    clock.now += 61
+
+    assert policy.status()['p90_seconds_per_minute'] == 0
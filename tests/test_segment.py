@@ -0,0 +1,45 @@
+from app.services.segment import Emotion, Segment, VoiceStyle, reuse_unchanged_segments
+
+
+def _segments(*texts, **fields):
+    return [Segment(text=text, **fields) for text in texts]
+
+
+def test_unchanged_segments_keep_previous_delivery_and_audio():
+    previous = _segments('One.', 'Two.', 'Three.', emotion=Emotion.JOY, audio_key='old')
+    revised = _segments('One.', 'Two.', 'Three.', emotion=Emotion.SADNESS)
+
+    merged, changed = reuse_unchanged_segments(previous, revised)
+
+    assert changed == 0
+    assert all(segment is old for segment, old in zip(merged, previous))
+
+
+def test_edited_segment_is_the_only_change():
+    previous = _segments('One.', 'Two.', 'Three.', audio_key='old')
+    revised = _segments('One.', 'Deux.', 'Three.')
+
+    merged, changed = reuse_unchanged_segments(previous, revised)
+
+    assert changed == 1
+    assert [s.text for s in merged] == ['One.', 'Deux.', 'Three.']
+    assert merged[0] is previous[0] and merged[2] is previous[2]
+    assert merged[1] is revised[1]
+
+
+def test_insertions_and_deletions_count_only_new_segments():
+    previous = _segments('One.', 'Two.', 'Three.', 'Four.')
+    revised = _segments('Zero.', 'One.', 'Three.', 'Four.', 'Five.')
+
+    merged, changed = reuse_unchanged_segments(previous, revised)
+
+    assert changed == 2
+    assert [s.text for s in merged] == ['Zero.', 'One.', 'Three.', 'Four.', 'Five.']
+    assert merged[1] is previous[0]
+
+
+def test_segment_round_trips_through_dict():
+    segment = Segment(text='Boo!', emotion=Emotion.FEAR, style=VoiceStyle.TERRIFIED,
+                      speed=1.1, pause_after=0.8, audio_key='abc')
+
+    assert Segment.from_dict(segment.to_dict()) == segment
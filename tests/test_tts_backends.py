@@ -0,0 +1,94 @@
+import threading
+import time
+
+import numpy as np
+
+from app.services.audio_assembler import AudioAssembler
+from app.services.tts_backends import HedgedBackend, LocalBackend, TTSBackend
+
+
+class ScriptedBackend(TTSBackend):
+    """Answers each call after the next scripted delay, labelled with its call number"""
+
+    name = 'scripted'
+
+    def __init__(self, delays=()):
+        self.delays = list(delays)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, voice_id, style=None, rate=1.0, pitch=1.0):
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+            delay = self.delays.pop(0) if self.delays else 0
+        time.sleep(delay)
+        return f'call{number}'.encode()
+
+    def list_voices(self):
+        return []
+
+
+def _warm_up(hedged, count):
+    for _ in range(count):
+        hedged.synthesize('warm up', 'voice')
+
+
+def test_no_hedging_until_enough_samples():
+    backend = ScriptedBackend([0.05] * 3)
+    hedged = HedgedBackend(backend, percentile=50, max_ratio=1.0, min_samples=5)
+
+    _warm_up(hedged, 3)
+
+    assert backend.calls == 3
+
+
+def test_slow_call_is_hedged_and_first_answer_wins():
+    backend = ScriptedBackend([0.01] * 5 + [1.0, 0.0])
+    hedged = HedgedBackend(backend, percentile=50, max_ratio=1.0, min_samples=5)
+    _warm_up(hedged, 5)
+
+    start = time.perf_counter()
+    result = hedged.synthesize('slow one', 'voice')
+
+    assert result == b'call7'
+    assert time.perf_counter() - start < 0.5
+
+
+def test_hedges_are_capped_at_max_ratio():
+    backend = ScriptedBackend([0.0] * 30 + [0.1] * 20)
+    hedged = HedgedBackend(backend, percentile=50, max_ratio=0.1, min_samples=10)
+    _warm_up(hedged, 30)
+
+    for _ in range(10):
+        hedged.synthesize('slow one', 'voice')
+
+    # Every slow call wanted a hedge, but 40 calls at a 10% cap allow four
+    assert hedged._hedges == 4
+    time.sleep(0.2)
+    assert backend.calls == 44
+
+
+def test_local_backend_renders_deterministically():
+    backend = LocalBackend(AudioAssembler(), sample_rate=8000)
+
+    first = backend.render('Once upon a time', 'en-US-cooper')
+    again = backend.render('Once upon a time', 'en-US-cooper')
+    other_voice = backend.render('Once upon a time', 'en-US-hazel')
+
+    assert first.dtype == np.int16
+    assert np.array_equal(first, again)
+    assert len(other_voice) == len(first)
+    assert not np.array_equal(other_voice, first)
+
+
+def test_local_backend_clip_length_follows_text_and_rate():
+    backend = LocalBackend(AudioAssembler(), sample_rate=8000)
+
+    short = backend.render('Hi', 'en-US-cooper')
+    longer = backend.render('Hi there traveller', 'en-US-cooper')
+    faster = backend.render('Hi there traveller', 'en-US-cooper', rate=2.0)
+
+    assert len(short) < len(longer)
+    assert len(faster) < len(longer)
+    assert len(backend.render('', 'en-US-cooper')) == 0